@@ -0,0 +1,194 @@
+"""
+Rendering benchmarks: python -m benchmarks.render_bench [--save-baseline base.json | --compare base.json]
+"""
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import sys
+import json
+import time
+import ctypes
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+from PySide6 import __version__ as PYSIDE_VERSION
+from PySide6.QtGui import QImage, QColor, QPainter, QLinearGradient
+from PySide6.QtWidgets import QApplication
+
+from logic.theme_model import ThemeModel
+from render.render_engine import RenderEngine
+
+CANVAS_SIZES = {"16:9": (1000, 562), "21:9": (1000, 428), "1080p": (1920, 1080), "4k": (3840, 2160)}
+IMAGE_SIZES = {"none": None, "1080p": (1920, 1080), "6000px": (6000, 4000)}
+BROWSERS = ("Chrome", "Brave", "Edge")
+
+def percentile(samples, pct):
+    s = sorted(samples)
+    k = (len(s) - 1) * pct / 100.0
+    lo = int(k); hi = min(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (k - lo)
+
+def make_image(path, size):
+    img = QImage(size[0], size[1], QImage.Format_RGB32)
+    grad = QLinearGradient(0, 0, size[0], size[1]); grad.setColorAt(0, QColor("#1A73E8")); grad.setColorAt(1, QColor("#F50057"))
+    p = QPainter(img); p.fillRect(img.rect(), grad); p.end()
+    img.save(path, "PNG")
+    return path
+
+def make_theme(image_path):
+    theme = ThemeModel()
+    if image_path: theme.update({"ntp_image": image_path, "frame_image": image_path})
+    return theme
+
+try: _libc = ctypes.CDLL("libc.so.6") # glibc, for malloc_trim()
+except OSError: _libc = None
+
+def proc_status_kb(field):
+    """A kB field of /proc/self/status (VmRSS, VmHWM), or None where there is none."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"): return int(line.split()[1])
+    except OSError: pass
+    return None
+
+def reset_peak_rss():
+    # Hand freed heap pages back first, or a buffer reusing them would not show up as growth
+    if _libc is not None: _libc.malloc_trim(0)
+    # Writing 5 to clear_refs resets VmHWM (the peak RSS) to the current RSS
+    try:
+        with open("/proc/self/clear_refs", "w") as f: f.write("5")
+        return True
+    except OSError: return False
+
+def measure(fn, iterations, warmup=2):
+    """Times `fn` and, in a second pass, its peak RSS growth and peak traced Python allocation."""
+    for _ in range(warmup): fn()
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter(); fn(); samples.append((time.perf_counter() - t0) * 1000.0)
+    rss_peaks = []
+    for _ in range(max(1, iterations // 5)):
+        if not reset_peak_rss(): break
+        before = proc_status_kb("VmRSS"); fn(); peak = proc_status_kb("VmHWM")
+        if before is None or peak is None: break
+        rss_peaks.append(peak - before)
+    tracemalloc.start(); peaks = []
+    for _ in range(max(1, iterations // 5)):
+        tracemalloc.reset_peak(); fn(); peaks.append(tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return {"p50_ms": percentile(samples, 50), "p95_ms": percentile(samples, 95), "p99_ms": percentile(samples, 99),
+            "mean_ms": sum(samples) / len(samples), "rss_peak_kb": max(rss_peaks) if rss_peaks else None,
+            "py_heap_kb": max(peaks) / 1024.0, "iterations": iterations}
+
+# ─── Cases ───
+
+def engine_cases(images, quick):
+    canvases = ("16:9", "4k") if quick else tuple(CANVAS_SIZES)
+    for canvas in canvases:
+        for img_name in images:
+            yield f"{canvas}/{img_name}/Chrome", CANVAS_SIZES[canvas], images[img_name], "Chrome", False
+    # Browser skins and incognito on the default canvas
+    for browser in BROWSERS:
+        for incognito in (False, True):
+            yield f"16:9/1080p/{browser}{'/incognito' if incognito else ''}", CANVAS_SIZES["16:9"], images.get("1080p"), browser, incognito
+
+def bench_engine(images, iterations, quick, want):
+    results = {}
+    for name, size, image_path, browser, incognito in engine_cases(images, quick):
+        if not any(want(f"{kind}/{name}") for kind in ("ui_layer", "ntp_layer", "render", "color_edit")): continue
+        engine = RenderEngine(); theme = make_theme(image_path)
+        engine.render(theme, browser, incognito, size) # decode and warm the scaled-image cache
+
+        def ui_layer():
+            engine.invalidate(); engine.render_ui_layer(theme, browser, incognito, size)
+        def ntp_layer():
+            engine.invalidate(); engine.render_ntp_layer(theme, incognito, size)
+        def full():
+            engine.invalidate(); engine.render(theme, browser, incognito, size)
+        # Incremental: one UI color edit, reusing the cached NTP layer and untouched regions
+        colors = ["#112233FF", "#332211FF"]
+        def color_edit():
+            colors.reverse(); theme["tab_text"] = colors[0]; engine.render(theme, browser, incognito, size)
+
+        for kind, fn in (("ui_layer", ui_layer), ("ntp_layer", ntp_layer), ("render", full), ("color_edit", color_edit)):
+            if (kind == "ntp_layer" and incognito) or not want(f"{kind}/{name}"): continue
+            results[f"{kind}/{name}"] = measure(fn, iterations)
+            print(f"  {kind}/{name}: p50 {results[f'{kind}/{name}']['p50_ms']:.2f} ms", file=sys.stderr)
+    return results
+
+def bench_apply_theme(images, iterations, quick, want):
+    """PreviewRenderer.apply_theme() on a real (offscreen) MainWindow, after a color edit."""
+    cases = [(c, i) for c in (("16:9",) if quick else ("16:9", "4k")) for i in ("none", "6000px") if want(f"apply_theme/{c}/{i}")]
+    if not cases: return {}
+    from ui.window.main_window import MainWindow
+    results = {}
+    window = MainWindow(); hp = window.home_page
+    for canvas, img_name in cases:
+        hp.canvas.setFixedSize(*CANVAS_SIZES[canvas])
+        window.theme_data["ntp_image"] = images[img_name]; window.theme_data["frame_image"] = images[img_name]
+        hp.set_mode("tab_text")
+        hp.renderer.apply_theme(); hp.renderer.store.loader.wait(); QApplication.processEvents(); hp.renderer.apply_theme()
+        colors = ["#112233FF", "#332211FF"]
+        def apply_theme():
+            colors.reverse(); window.theme_data["tab_text"] = colors[0]; hp.renderer.apply_theme()
+        results[f"apply_theme/{canvas}/{img_name}"] = measure(apply_theme, iterations)
+    window.close()
+    return results
+
+# ─── Reporting ───
+
+def compare(results, baseline, threshold):
+    """Returns (case, baseline p50, current p50, ratio) for cases slower than baseline by more than `threshold`."""
+    regressions = []
+    for case, cur in sorted(results.items()):
+        base = baseline.get("results", {}).get(case)
+        if not base or base["p50_ms"] <= 0: continue
+        ratio = cur["p50_ms"] / base["p50_ms"]
+        if ratio > 1.0 + threshold: regressions.append((case, base["p50_ms"], cur["p50_ms"], ratio))
+    return regressions
+
+def print_table(results):
+    print(f"{'case':<52} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS KB':>9} {'pyheap KB':>10}")
+    for case, r in sorted(results.items()):
+        rss = f"{r['rss_peak_kb']:>9}" if r.get("rss_peak_kb") is not None else f"{'n/a':>9}"
+        print(f"{case:<52} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {rss} {r['py_heap_kb']:>10.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the theme preview renderer.")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--quick", action="store_true", help="fewer canvas sizes and iterations")
+    parser.add_argument("--no-window", action="store_true", help="skip the MainWindow apply_theme cases")
+    parser.add_argument("--filter", metavar="TEXT", help="only run cases whose name contains TEXT (e.g. 'render/4k')")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write results as a baseline JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare p50 latencies against a baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed p50 slowdown before flagging (default 0.15)")
+    args = parser.parse_args(argv)
+    iterations = 5 if args.quick else args.iterations
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as tmp:
+        images = {name: (make_image(os.path.join(tmp, f"{name}.png"), size) if size else None) for name, size in IMAGE_SIZES.items()}
+        want = lambda case: not args.filter or args.filter in case
+        results = bench_engine(images, iterations, args.quick, want)
+        if not args.no_window: results.update(bench_apply_theme(images, iterations, args.quick, want))
+
+    print_table(results)
+    report = {"meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "pyside": PYSIDE_VERSION,
+                       "platform": platform.platform(), "qpa": os.environ.get("QT_QPA_PLATFORM"), "iterations": iterations},
+              "results": results}
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f: json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as f: baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for case, base, cur, ratio in regressions: print(f"REGRESSION {case}: {base:.2f} ms -> {cur:.2f} ms (x{ratio:.2f})")
+        if regressions: return 1
+        print("No regressions against baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Headless batch export: `python main.py export --input themes/ --out packages/ --jobs 4 [--format crx]`."""
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from logic.theme_model import ThemeModel, DEFAULT_THEME, IMAGE_KEYS
+from logic.export_manager import ExportJob
+from logic.export_cache import ExportCache
+from logic.crx_writer import load_or_create_key
+from logic.export_trace import export_log_path
+
+def find_theme_files(path):
+    if os.path.isdir(path): return sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(".json"))
+    return [path]
+
+def load_theme(json_path):
+    """Reads a theme JSON like the editor's import; relative image paths are resolved against the file."""
+    with open(json_path, 'r') as f: data = json.load(f)
+    data = {k: v for k, v in data.items() if k in DEFAULT_THEME}
+    base = os.path.dirname(os.path.abspath(json_path))
+    for key in IMAGE_KEYS:
+        if data.get(key) and not os.path.isabs(data[key]): data[key] = os.path.join(base, data[key])
+    return ThemeModel(data)
+
+def export_one(json_path, out_dir, fmt, version, threads, key_path=None, image_options=None, verbose=False):
+    """
+    Runs in a worker process. `image_options` are ExportJob's optimize/strip_meta/optimize_budget/ntp_size.
+    Returns (json_path, package path or None, seconds, bytes, bytes saved by PNG optimization, error or None, timing report or None).
+    """
+    t0 = time.perf_counter()
+    try:
+        name = os.path.splitext(os.path.basename(json_path))[0]
+        export_data = {"meta_name": name, "meta_author": "", "meta_version": version, "meta_desc": "", "format": fmt,
+                       "dest_path": os.path.join(out_dir, f"{name}.{fmt}"), "key_path": key_path}
+        job = ExportJob(load_theme(json_path), export_data, version, {}, verbose, ExportCache(), **(image_options or {}))
+        job.max_workers = threads
+        try: dest = job.build()
+        except Exception as e: job.write_trace("failed", str(e)); raise
+        job.write_trace("done")
+        saved = sum(before - after for before, after in job.optimize_report.values())
+        return json_path, dest, time.perf_counter() - t0, os.path.getsize(dest), saved, None, job.trace and job.trace.report()
+    except Exception as e:
+        return json_path, None, time.perf_counter() - t0, 0, 0, str(e), None
+
+def run(argv):
+    parser = argparse.ArgumentParser(prog="main.py export", description="Export theme JSON files to theme packages without the GUI.")
+    parser.add_argument("--input", required=True, help="a theme JSON file or a directory of them")
+    parser.add_argument("--out", required=True, help="directory for the generated packages")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    parser.add_argument("--format", choices=("zip", "crx"), default="zip")
+    parser.add_argument("--version", default="1.0", help="manifest version for every package")
+    parser.add_argument("--key", help="PEM key to sign every CRX with (default: a persisted key per theme name)")
+    parser.add_argument("--optimize", action="store_true", help="search for smaller lossless PNG encodings")
+    parser.add_argument("--optimize-budget", type=float, default=10.0, metavar="SECONDS", help="time limit for --optimize per theme (default 10)")
+    parser.add_argument("--strip-meta", action="store_true", help="drop PNG metadata chunks")
+    parser.add_argument("--verbose", action="store_true", help="print per-stage timings and append them to the export log")
+    parser.add_argument("--ntp-size", default="1920x1080", metavar="WxH", help="resolution of the exported New Tab image (default 1920x1080)")
+    args = parser.parse_args(argv)
+
+    files = find_theme_files(args.input)
+    if not files:
+        print(f"No theme JSON files found in {args.input}", file=sys.stderr)
+        return 1
+    os.makedirs(args.out, exist_ok=True)
+    if args.format == "crx" and args.key: load_or_create_key(args.key) # create a shared key once, not racing in every worker
+    jobs = max(1, min(args.jobs, len(files)))
+    threads = max(1, (os.cpu_count() or 1) // jobs) # encoder threads per process, so processes x threads ~ cores
+
+    try: ntp_size = tuple(int(v) for v in args.ntp_size.lower().split("x"))
+    except ValueError: ntp_size = ()
+    if len(ntp_size) != 2 or min(ntp_size) < 1: parser.error(f"--ntp-size must look like 1920x1080, not {args.ntp_size!r}")
+    image_options = {"optimize": args.optimize, "strip_meta": args.strip_meta, "optimize_budget": args.optimize_budget, "ntp_size": ntp_size}
+    t0 = time.perf_counter(); results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(export_one, f, args.out, args.format, args.version, threads, args.key, image_options, args.verbose) for f in files]
+        for future in as_completed(futures):
+            path, dest, secs, size, saved, error, report = future.result(); results.append((path, dest, secs, size, saved, error))
+            status = f"{size / 1024:.0f} KB -> {dest}" if error is None else f"FAILED: {error}"
+            if saved: status += f" (PNG optimization saved {saved / 1024:.0f} KB)"
+            print(f"[{len(results)}/{len(files)}] {os.path.basename(path)}  {secs:.2f}s  {status}", flush=True)
+            if report: print(report, flush=True)
+
+    failed = [r for r in results if r[5] is not None]
+    if args.verbose: print(f"\nStage timings appended to {export_log_path()}")
+    print(f"\n{len(results) - len(failed)} exported, {len(failed)} failed in {time.perf_counter() - t0:.2f}s ({jobs} processes)")
+    for path, _, _, _, _, error in sorted(failed): print(f"  {path}: {error}")
+    return 1 if failed else 0
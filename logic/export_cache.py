@@ -0,0 +1,101 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from PySide6.QtCore import QStandardPaths
+
+# Bump when the encoder output for the same inputs changes, so stale entries are never reused
+ENCODER_VERSION = 2
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_END = b"IEND\xaeB`\x82" # type and CRC of the IEND chunk every complete PNG ends with
+
+def file_digest(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""): h.update(chunk)
+    return h.hexdigest()
+
+class ExportCache:
+    """On-disk cache of encoded assets keyed on everything that decides the output; LRU-evicted by bytes, thread-safe."""
+    def __init__(self, root=None, max_bytes=256 * 1024 * 1024):
+        self.root = root or os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation), "ChromiumThemeStudio", "export_cache")
+        self.max_bytes = max_bytes
+        self.hits = 0; self.misses = 0
+        self._digests = {} # (path, mtime_ns, size) -> sha256 of the file, so unchanged sources are hashed once
+        self._lock = threading.Lock()
+
+    def source_digest(self, path):
+        st = os.stat(path)
+        stamp = (path, st.st_mtime_ns, st.st_size)
+        digest = self._digests.get(stamp)
+        if digest is None: digest = self._digests[stamp] = file_digest(path)
+        return digest
+
+    def key(self, path, props, size, variant="", fmt="png"):
+        """
+        Cache key for `path` encoded as `fmt` at `size` (w, h) with `props`, `variant` naming
+        any encoder options; None if the source can't be read.
+        """
+        try: source = self.source_digest(path)
+        except OSError: return None
+        inputs = json.dumps([ENCODER_VERSION, source, props or {}, list(size), variant, fmt], sort_keys=True)
+        return hashlib.sha256(inputs.encode("utf-8")).hexdigest() + "." + fmt
+
+    def _path(self, key): return os.path.join(self.root, key)
+
+    @staticmethod
+    def _complete(key, data):
+        if key.endswith(".png"): return data.startswith(PNG_SIGNATURE) and data.endswith(PNG_END)
+        return bool(data)
+
+    def get(self, key):
+        """Cached bytes for `key`, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f: data = f.read()
+            if not self._complete(key, data): # empty or truncated: drop it and encode again
+                os.remove(path); raise OSError
+            os.utime(path) # mark as recently used
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Stores `data` atomically; a failed write only costs the cache entry."""
+        path = self._path(key); tmp = None
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            # A unique temp file: threads of different batch worker processes can share an ident
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f: f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            if tmp and os.path.exists(tmp): os.remove(tmp)
+            return
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            try: entries = [e for e in os.scandir(self.root) if e.is_file() and not e.name.endswith(".tmp")]
+            except OSError: return
+            stats = sorted(((e.stat().st_mtime_ns, e.stat().st_size, e.path) for e in entries))
+            total = sum(size for _, size, _ in stats)
+            for _, size, path in stats:
+                if total <= self.max_bytes: break
+                try: os.remove(path); total -= size
+                except OSError: pass
+
+    def clear(self):
+        with self._lock:
+            if not os.path.isdir(self.root): return
+            for e in os.scandir(self.root):
+                try: os.remove(e.path)
+                except OSError: pass
+
+    def stats(self):
+        try: entries = [e.stat().st_size for e in os.scandir(self.root) if e.is_file()]
+        except OSError: entries = []
+        return {"entries": len(entries), "bytes": sum(entries), "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
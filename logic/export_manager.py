@@ -1,113 +1,309 @@
 import os
+import re
 import json
-import tempfile
+import time
+import hashlib
 import zipfile
-from PySide6.QtWidgets import QMessageBox
-from PySide6.QtGui import QPixmap, QColor
-from PySide6.QtCore import Qt
-
-class ExportManager:
-    @staticmethod
-    def run_export_process(parent_window, theme_data, export_data, p_settings, renderer, is_log_enabled):
-        dest_path = export_data["dest_path"]
-        fmt = export_data["format"]
-        
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PySide6.QtGui import QImage, QImageReader
+from PySide6.QtCore import QObject, QRunnable, QThread, QThreadPool, QStandardPaths, Qt, Signal
+from logic.theme_model import ThemeModel, IMAGE_KEYS
+from logic.export_cache import ExportCache
+from logic.crx_writer import load_or_create_key, write_crx
+from logic.png_optimizer import encode_png, optimize_png, strip_chunks
+from logic.export_trace import ExportTrace, write_log
+from logic import image_pipeline
+
+# Image key -> (file written to images/, manifest image keys pointing at it; the *_inactive ones are fallbacks)
+IMAGE_OUTPUTS = {
+    "frame_image": ("theme_frame.png", ("theme_frame", "theme_frame_inactive")),
+    "ntp_image": ("theme_ntp_background.png", ("theme_ntp_background",)),
+    "frame_image_incognito": ("theme_frame_incognito.png", ("theme_frame_incognito", "theme_frame_incognito_inactive")),
+}
+
+# Already-compressed formats are stored as-is; deflating them again only costs time
+STORED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+PACKAGE_WRITE_BUFFER = 1024 * 1024 # one large write per MB instead of many small ones (slow network shares)
+
+def transparent_overlay_png():
+    # 1x1 transparent overlay, used for both 'theme_frame_overlay' and 'theme_window_control_background'
+    overlay = QImage(1, 1, QImage.Format_ARGB32); overlay.fill(Qt.transparent)
+    return encode_png(overlay)
+
+def write_package(fileobj, files):
+    """Writes {archive name: bytes} as a zip straight from memory, storing already-compressed assets."""
+    with zipfile.ZipFile(fileobj, 'w') as zipf:
+        for name, data in files.items():
+            compress = zipfile.ZIP_STORED if name.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+            zipf.writestr(name, data, compress_type=compress)
+
+def crx_key_path(theme_name):
+    """Default signing key for a theme. One key per theme name keeps its extension ID stable across exports."""
+    slug = re.sub(r"[^a-z0-9]+", "_", theme_name.lower()).strip("_") or "theme"
+    return os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation), "ChromiumThemeStudio", "crx_keys", slug + ".pem")
+
+def build_manifest(theme, export_data, version, image_files):
+    """Manifest dict for `theme`; `image_files` maps each packaged IMAGE_OUTPUTS key to its archive path."""
+    # MAPPING: UI Keys -> Manifest Keys
+    rgb = lambda key: list(theme.rgba(key)[:3])
+    colors = {
+        "frame": rgb("frame"),
+        "toolbar": rgb("toolbar"),
+        "tab_text": rgb("tab_text"),
+        "tab_background_text": rgb("inactive_tab_text"),
+        "tab_background": rgb("inactive_tab"),
+        "bookmark_text": rgb("bookmark_text"),
+        "ntp_text": rgb("toolbar_text"),
+
+        # FIX 1: Force button_background to be fully transparent.
+        # This prevents Chrome from painting a solid color block behind window controls.
+        "button_background": [0, 0, 0, 0],
+
+        # WIRED: Explicit mappings for the new options
+        "omnibox_background": rgb("omnibox_background"),
+        "omnibox_text": rgb("omnibox_text"),
+        "ntp_background": rgb("ntp_background"),
+    }
+
+    if theme.get("frame_incognito"): colors["frame_incognito"] = rgb("frame_incognito")
+    if theme.get("frame_incognito_inactive"): colors["frame_incognito_inactive"] = rgb("frame_incognito_inactive")
+
+    manifest = {
+        "manifest_version": 3, "version": version, "name": export_data["meta_name"], "description": export_data["meta_desc"],
+        "theme": {
+            "colors": colors,
+            "images": {
+                "theme_frame_overlay": "images/theme_frame_overlay.png",
+                # FIX 2: Define a transparent background for window controls to stop Windows caption rendering fallback
+                "theme_window_control_background": "images/theme_frame_overlay.png"
+            }
+        }
+    }
+
+    # FIX 3: Add fallback keys for inactive states if images are present
+    for key, archive_path in image_files.items():
+        for manifest_key in IMAGE_OUTPUTS[key][1]: manifest["theme"]["images"][manifest_key] = archive_path
+    if "ntp_image" in image_files:
+        manifest["theme"]["properties"] = { "ntp_background_alignment": "center bottom", "ntp_background_repeat": "no-repeat" }
+    return manifest
+
+class ExportCancelled(Exception):
+    pass
+
+class _ExportSignals(QObject):
+    progress = Signal(str, int) # stage, percent
+    finished = Signal(str, str) # format, destination path
+    failed = Signal(str)
+    cancelled = Signal()
+
+class ExportJob(QRunnable):
+    """Builds one theme package on a worker thread from detached data; written beside the destination and renamed in at the end."""
+    def __init__(self, theme, export_data, version, sources, is_log_enabled, cache=None, optimize=False, strip_meta=False, optimize_budget=10.0,
+                 ntp_size=image_pipeline.NTP_TARGET_SIZE):
+        super().__init__()
+        self.setAutoDelete(False) # ExportManager owns the job until it reports back
+        self.theme = theme; self.export_data = export_data; self.version = version
+        self.sources = sources # image key -> QImage from the preview cache, or None to decode here
+        self.is_log_enabled = is_log_enabled # also turns on the per-stage ExportTrace
+        self.trace = None
+        self.cache = cache # ExportCache of previously encoded assets, or None
+        self.ntp_size = tuple(ntp_size) # NTP images are resampled to this canvas; frames are cut to the visible strip
+        # PNG optimization: search for the smallest lossless encoding for up to `optimize_budget` seconds in total
+        self.optimize = optimize; self.strip_meta = strip_meta; self.optimize_budget = optimize_budget
+        self.optimize_deadline = None
+        self.optimize_report = {} # image key -> (default PNG bytes, optimized PNG bytes)
+        self.max_workers = max(1, QThread.idealThreadCount())
+        self.signals = _ExportSignals()
+        self._cancelled = False
+
+    def cancel(self): self._cancelled = True
+
+    def _step(self, stage, percent):
+        if self._cancelled: raise ExportCancelled()
+        self.signals.progress.emit(stage, percent)
+
+    def _timed(self, stage, asset=None):
+        return self.trace.stage(stage, asset) if self.trace else nullcontext()
+
+    def write_trace(self, status, error=None):
+        if self.trace: write_log(self.trace.record(status, format=self.export_data["format"], dest=self.export_data["dest_path"], error=error))
+
+    def run(self):
+        try: dest = self.build()
+        except ExportCancelled: self.write_trace("cancelled"); self.signals.cancelled.emit()
+        except Exception as e: self.write_trace("failed", str(e)); self.signals.failed.emit(str(e))
+        else: self.write_trace("done"); self.signals.finished.emit(self.export_data["format"], dest)
+
+    def _image(self, key):
+        img = self.sources.get(key)
+        if img is None or img.isNull():
+            reader = QImageReader(self.theme[key])
+            with self._timed("load", key): img = reader.read()
+            if img.isNull(): raise IOError(f"Could not read {self.theme[key]}: {reader.errorString()}")
+        return img
+
+    def _output_size(self, key):
+        img = self.sources.get(key)
+        if img is not None and not img.isNull(): w, h = img.width(), img.height()
+        else:
+            size = QImageReader(self.theme[key]).size(); w, h = size.width(), size.height()
+        if w <= 0 or h <= 0: return (w, h) # unreadable; _image() reports it
+        return image_pipeline.output_size(key, w, h, self.theme.get(f"{key}_properties"), self.ntp_size)
+
+    def _encode(self, key):
+        if self._cancelled: raise ExportCancelled()
+        variant = ("optimized" if self.optimize else "") + ("-stripped" if self.strip_meta else "")
+        with self._timed("cache", key):
+            cache_key = self.cache.key(self.theme[key], self.theme.get(f"{key}_properties"), self._output_size(key), variant) if self.cache else None
+            data = self.cache.get(cache_key) if cache_key else None
+        cached = data is not None
+        if data is None:
+            source = self._image(key)
+            with self._timed("process", key): img = image_pipeline.process(key, source, self.theme.get(f"{key}_properties"), self.ntp_size)
+            if img.isNull(): return None # moved entirely out of view: nothing to ship
+            with self._timed("encode", key): data = encode_png(img)
+            if data is None: raise IOError(f"Could not encode {self.theme[key]}")
+            finished = True
+            if self.optimize:
+                with self._timed("optimize", key):
+                    before = len(data)
+                    data, finished = optimize_png(img, data, self.strip_meta, self.optimize_deadline)
+                self.optimize_report[key] = (before, len(data))
+            elif self.strip_meta:
+                with self._timed("optimize", key): data = strip_chunks(data)
+            # A search cut short by the time budget is not cached, so a later export can finish it
+            if cache_key and finished: self.cache.put(cache_key, data)
+        if self.trace:
+            try: source_bytes = os.path.getsize(self.theme[key])
+            except OSError: source_bytes = 0
+            self.trace.asset(IMAGE_OUTPUTS[key][0], source=source_bytes, output=len(data), cached=cached)
+        return data
+
+    def _encode_all(self, keys):
+        """
+        PNG-encodes the images concurrently and returns {key: png bytes}.
+        QImage is safe off the GUI thread and encoding releases the GIL.
+        """
+        if not keys: return {}
+        self.optimize_deadline = time.monotonic() + self.optimize_budget
+        # Keys showing the same picture with the same properties are encoded once
+        groups = {}
+        for key in keys:
+            kind = "ntp" if key == "ntp_image" else "frame"
+            groups.setdefault((kind, self.theme[key], json.dumps(self.theme.get(f"{key}_properties"), sort_keys=True)), []).append(key)
+        with ThreadPoolExecutor(max_workers=min(len(groups), self.max_workers)) as pool:
+            futures = {pool.submit(self._encode, group[0]): group for group in groups.values()}
+            encoded = {}
+            try:
+                for future in as_completed(futures):
+                    group = futures[future]
+                    for key in group: encoded[key] = future.result()
+                    stage = f"Encoded {len(encoded)} of {len(keys)} images"
+                    if group[0] in self.optimize_report:
+                        before, after = self.optimize_report[group[0]]
+                        stage += f" ({IMAGE_OUTPUTS[group[0]][0]}: {before // 1024} KB -> {after // 1024} KB)"
+                    self._step(stage, 10 + 70 * len(encoded) // len(keys))
+            except BaseException:
+                for future in futures: future.cancel()
+                raise
+        return encoded
+
+    def build(self):
+        dest_path = self.export_data["dest_path"]
+        part_path = dest_path + ".part"
+        if self.is_log_enabled: self.trace = ExportTrace()
+        self._step("Preparing", 0)
+        overlay = transparent_overlay_png()
+        files = {"images/theme_frame_overlay.png": overlay}
+        keys = [key for key in IMAGE_OUTPUTS if self.theme.get(key)]
+
+        self._step("Encoding images", 10)
+        encoded = self._encode_all(keys)
+        # Identical outputs (e.g. the same picture for the normal and incognito frame) are packaged once
+        by_content = {hashlib.sha256(overlay).digest(): "images/theme_frame_overlay.png"}
+        image_files = {}
+        keys = [key for key in keys if encoded[key] is not None]
+        for key in keys:
+            name = by_content.setdefault(hashlib.sha256(encoded[key]).digest(), "images/" + IMAGE_OUTPUTS[key][0])
+            files[name] = encoded[key]; image_files[key] = name
+
+        if self.optimize_report:
+            saved = sum(before - after for before, after in self.optimize_report.values())
+            self._step(f"PNG optimization saved {saved // 1024} KB", 80)
+
+        self._step("Writing manifest", 80)
+        with self._timed("manifest"):
+            manifest = build_manifest(self.theme, self.export_data, self.version, image_files)
+            indent = None if self.is_log_enabled else 4
+            files = {"manifest.json": json.dumps(manifest, indent=indent).encode("utf-8"), **files}
+
+        self._step("Packaging", 85)
         try:
-            with tempfile.TemporaryDirectory() as tmp_dir:
-                images_dir = os.path.join(tmp_dir, "images")
-                os.makedirs(images_dir, exist_ok=True)
-                
-                ver = export_data["meta_version"]
-                if p_settings.get_auto_increment():
-                    parts = ver.split('.')
-                    if len(parts) > 0 and parts[-1].isdigit(): 
-                        parts[-1] = str(int(parts[-1]) + 1)
-                        ver = ".".join(parts)
-
-                # Generate a 1x1 transparent overlay
-                # We will use this for both 'theme_frame_overlay' and 'theme_window_control_background'
-                overlay_pix = QPixmap(1, 1); overlay_pix.fill(Qt.transparent)
-                overlay_pix.save(os.path.join(images_dir, "theme_frame_overlay.png"), "PNG")
-
-                # MAPPING: UI Keys -> Manifest Keys
-                colors = { 
-                    "frame": ExportManager._hex_to_rgb_list(theme_data.get("frame", "#CC0000FF")), 
-                    "toolbar": ExportManager._hex_to_rgb_list(theme_data.get("toolbar", "#FFFFFFFF")), 
-                    "tab_text": ExportManager._hex_to_rgb_list(theme_data.get("tab_text", "#000000FF")), 
-                    "tab_background_text": ExportManager._hex_to_rgb_list(theme_data.get("inactive_tab_text", "#555555FF")), 
-                    "tab_background": ExportManager._hex_to_rgb_list(theme_data.get("inactive_tab", "#E68A8AFF")), 
-                    "bookmark_text": ExportManager._hex_to_rgb_list(theme_data.get("bookmark_text", "#555555FF")), 
-                    "ntp_text": ExportManager._hex_to_rgb_list(theme_data.get("toolbar_text", "#333333FF")), 
-                    
-                    # FIX 1: Force button_background to be fully transparent.
-                    # This prevents Chrome from painting a solid color block behind window controls.
-                    "button_background": [0, 0, 0, 0],
-                    
-                    # WIRED: Explicit mappings for the new options
-                    "omnibox_background": ExportManager._hex_to_rgb_list(theme_data.get("omnibox_background", "#F0F0F0FF")),
-                    "omnibox_text": ExportManager._hex_to_rgb_list(theme_data.get("omnibox_text", "#000000FF")),
-                    "ntp_background": ExportManager._hex_to_rgb_list(theme_data.get("ntp_background", "#FFFFFFFF")),
-                }
-                
-                if theme_data.get("frame_incognito"): colors["frame_incognito"] = ExportManager._hex_to_rgb_list(theme_data["frame_incognito"])
-                if theme_data.get("frame_incognito_inactive"): colors["frame_incognito_inactive"] = ExportManager._hex_to_rgb_list(theme_data["frame_incognito_inactive"])
-
-                manifest = { 
-                    "manifest_version": 3, "version": ver, "name": export_data["meta_name"], "description": export_data["meta_desc"],
-                    "theme": { 
-                        "colors": colors, 
-                        "images": { 
-                            "theme_frame_overlay": "images/theme_frame_overlay.png",
-                            # FIX 2: Define a transparent background for window controls to stop Windows caption rendering fallback
-                            "theme_window_control_background": "images/theme_frame_overlay.png"
-                        } 
-                    } 
-                }
-                
-                # FIX 3: Add fallback keys for inactive states if images are present
-                if theme_data.get("frame_image"):
-                    pix = renderer.get_processed_pixmap("frame_image")
-                    if pix: 
-                        pix.save(os.path.join(images_dir, "theme_frame.png"), "PNG")
-                        manifest["theme"]["images"]["theme_frame"] = "images/theme_frame.png"
-                        manifest["theme"]["images"]["theme_frame_inactive"] = "images/theme_frame.png" # Fallback
-
-                if theme_data.get("ntp_image"):
-                    pix = renderer.get_processed_pixmap("ntp_image")
-                    if pix: 
-                        pix.save(os.path.join(images_dir, "theme_ntp_background.png"), "PNG")
-                        manifest["theme"]["images"]["theme_ntp_background"] = "images/theme_ntp_background.png"
-                        manifest["theme"]["properties"] = { "ntp_background_alignment": "center bottom", "ntp_background_repeat": "no-repeat" }
-
-                if theme_data.get("frame_image_incognito"):
-                    pix = renderer.get_processed_pixmap("frame_image_incognito")
-                    if pix: 
-                        pix.save(os.path.join(images_dir, "theme_frame_incognito.png"), "PNG")
-                        manifest["theme"]["images"]["theme_frame_incognito"] = "images/theme_frame_incognito.png"
-                        manifest["theme"]["images"]["theme_frame_incognito_inactive"] = "images/theme_frame_incognito.png" # Fallback
-
-                indent = None if is_log_enabled else 4
-                with open(os.path.join(tmp_dir, "manifest.json"), 'w') as f: json.dump(manifest, f, indent=indent)
-                
-                final_zip_path = dest_path
-                if fmt == 'crx' and not dest_path.endswith('.zip'): final_zip_path = os.path.splitext(dest_path)[0] + ".zip"
-                with zipfile.ZipFile(final_zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for root, dirs, files in os.walk(tmp_dir):
-                        for file in files: zipf.write(os.path.join(root, file), os.path.relpath(os.path.join(root, file), tmp_dir))
-                
-                if fmt == 'crx':
-                     if os.path.exists(dest_path): os.remove(dest_path)
-                     os.rename(final_zip_path, dest_path)
-                     QMessageBox.information(parent_window, "CRX Generated", f"Package saved to {dest_path}.")
-                else: QMessageBox.information(parent_window, "ZIP Generated", f"Theme package saved successfully to {dest_path}.")
-                if p_settings.get_val("open_after_export", "true") == "true": os.startfile(os.path.dirname(dest_path))     
-        except Exception as e: QMessageBox.critical(parent_window, "Export Failed", f"An error occurred: {e}")
-
-    @staticmethod
-    def _hex_to_rgb_list(hex_str):
-        c = ExportManager.color_from_rgba_hex(hex_str); return [c.red(), c.green(), c.blue()]
-    @staticmethod
-    def color_from_rgba_hex(text):
-        if not isinstance(text, str) or not text.startswith("#") or len(text) != 9: return QColor(255, 255, 255, 255)
-        try: return QColor(int(text[1:3], 16), int(text[3:5], 16), int(text[5:7], 16), int(text[7:9], 16))
-        except ValueError: return QColor(255, 255, 255, 255)
\ No newline at end of file
+            with self._timed("package"), open(part_path, "wb", buffering=PACKAGE_WRITE_BUFFER) as f:
+                if self.export_data["format"] == "crx":
+                    key = load_or_create_key(self.export_data.get("key_path") or crx_key_path(self.export_data["meta_name"]))
+                    write_crx(f, key, lambda sink: write_package(sink, files))
+                else: write_package(f, files)
+            self._step("Finishing", 95)
+            with self._timed("rename"): os.replace(part_path, dest_path)
+        except BaseException:
+            if os.path.exists(part_path): os.remove(part_path)
+            raise
+        if self.trace:
+            self.trace.asset("manifest.json", output=len(files["manifest.json"]))
+            self.trace.asset(os.path.basename(dest_path), output=os.path.getsize(dest_path))
+        self.signals.progress.emit("Done", 100)
+        return dest_path
+
+class ExportManager(QObject):
+    """Runs theme exports in the background, one at a time, and relays the job's signals."""
+    progress = Signal(str, int)
+    finished = Signal(str, str)
+    failed = Signal(str)
+    cancelled = Signal()
+    report = Signal(str) # stage timings of the export that just ended (verbose logs only)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self); self.pool.setMaxThreadCount(1)
+        self.cache = ExportCache()
+        self.job = None
+
+    def start(self, theme_data, export_data, p_settings, renderer, is_log_enabled):
+        """Starts exporting `theme_data`; returns False if an export is already running."""
+        if self.job is not None: return False
+        theme = theme_data.copy() if isinstance(theme_data, ThemeModel) else ThemeModel(theme_data)
+
+        ver = export_data["meta_version"]
+        if p_settings.get_auto_increment():
+            parts = ver.split('.')
+            if len(parts) > 0 and parts[-1].isdigit():
+                parts[-1] = str(int(parts[-1]) + 1)
+                ver = ".".join(parts)
+
+        # Reuse decodes the preview already holds (QImage copies are cheap and thread-safe)
+        sources = {key: renderer.store.images.peek(theme[key]) for key in IMAGE_KEYS if theme.get(key)}
+
+        self.job = ExportJob(theme, dict(export_data), ver, sources, is_log_enabled, self.cache,
+                             optimize=p_settings.get_optimize_png(), strip_meta=p_settings.get_strip_meta(), optimize_budget=p_settings.get_optimize_budget(),
+                             ntp_size=p_settings.get_ntp_export_size())
+        self.job.signals.progress.connect(self.progress)
+        self.job.signals.finished.connect(self._on_finished)
+        self.job.signals.failed.connect(self._on_failed)
+        self.job.signals.cancelled.connect(self._on_cancelled)
+        self.pool.start(self.job)
+        return True
+
+    def cancel(self):
+        if self.job is not None: self.job.cancel()
+
+    def _emit_report(self):
+        if self.job.trace: self.report.emit(self.job.trace.report())
+
+    def wait(self, msecs=-1): return self.pool.waitForDone(msecs)
+
+    # Slots on this QObject, so the job's signals are delivered on the GUI thread
+    def _on_finished(self, fmt, path): self._emit_report(); self.job = None; self.finished.emit(fmt, path)
+    def _on_failed(self, message): self._emit_report(); self.job = None; self.failed.emit(message)
+    def _on_cancelled(self): self.job = None; self.cancelled.emit()
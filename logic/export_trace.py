@@ -0,0 +1,63 @@
+"""Per-stage export timings and asset sizes, appended to the export log when "Verbose Logs" is on."""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from PySide6.QtCore import QStandardPaths
+
+STAGES = ("load", "process", "cache", "encode", "optimize", "manifest", "package", "rename")
+
+def export_log_path():
+    return os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation), "ChromiumThemeStudio", "logs", "export_log.jsonl")
+
+class ExportTrace:
+    """Stage timings and asset sizes of one export. Safe to record into from encoder threads."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = [] # (stage, asset or None, seconds)
+        self.assets = {} # asset -> {"source": bytes, "output": bytes, "cached": bool}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, asset=None):
+        t0 = time.perf_counter()
+        try: yield
+        finally:
+            with self._lock: self.stages.append((name, asset, time.perf_counter() - t0))
+
+    def asset(self, name, **sizes):
+        with self._lock: self.assets.setdefault(name, {}).update(sizes)
+
+    def totals(self):
+        """{stage: (seconds summed over assets and threads, count)} in pipeline order."""
+        totals = {}
+        for name, _, secs in self.stages:
+            t, n = totals.get(name, (0.0, 0)); totals[name] = (t + secs, n + 1)
+        return {name: totals[name] for name in sorted(totals, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES))}
+
+    def elapsed(self): return time.perf_counter() - self.started
+
+    def report(self):
+        """Human-readable summary for the Export page."""
+        lines = [f"Export took {self.elapsed() * 1000:.0f} ms"]
+        for name, (secs, n) in self.totals().items():
+            lines.append(f"  {name:<9}{secs * 1000:8.1f} ms" + (f"  ({n}x)" if n > 1 else ""))
+        for name, sizes in self.assets.items():
+            parts = [f"{sizes[k] / 1024:.1f} KB {k}" for k in ("source", "output") if k in sizes]
+            lines.append(f"  {name}: {', '.join(parts)}" + (" (cached)" if sizes.get("cached") else ""))
+        return "\n".join(lines)
+
+    def record(self, status, **info):
+        """JSON-ready log entry."""
+        return {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "status": status, "total_ms": round(self.elapsed() * 1000, 2), **info,
+                "stages": [{"stage": s, "asset": a, "ms": round(t * 1000, 3)} for s, a, t in self.stages],
+                "totals_ms": {s: round(t * 1000, 3) for s, (t, _) in self.totals().items()}, "assets": self.assets}
+
+def write_log(record, path=None):
+    """Appends `record` to the export log; logging never fails an export."""
+    path = path or export_log_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f: f.write(json.dumps(record) + "\n")
+    except OSError: pass
@@ -0,0 +1,70 @@
+"""Export-time image processing: crops and scales a source image with its saved properties, matching the preview geometry."""
+from PySide6.QtGui import QImage, QPainter
+from PySide6.QtCore import QRect, QRectF, Qt
+
+REFERENCE_CANVAS = (1000, 562) # the preview canvas the offsets were set against
+FRAME_STRIP_HEIGHT = 120 # preview frame images are fitted to this height
+FRAME_MAX_WIDTH = 3840 # wide enough for a 4K window before Chromium starts tiling the frame
+NTP_TARGET_SIZE = (1920, 1080)
+NTP_TARGET_SIZES = ((1280, 720), (1920, 1080), (2560, 1440), (3840, 2160))
+
+def _props(props, default_scale):
+    if props: return props.get('scale', 100) / 100.0, props.get('x', 0), props.get('y', 0)
+    return default_scale, 0, 0
+
+def frame_geometry(src_w, src_h, props, max_width=FRAME_MAX_WIDTH, height=FRAME_STRIP_HEIGHT):
+    """(source rect to cut out, output (w, h)) for a frame image, or None if nothing is visible."""
+    scale, off_x, off_y = _props(props, height / src_h)
+    scaled_w, scaled_h = src_w * scale, src_h * scale
+    # Same crop as the preview: centered vertically on the strip, then shifted by the offsets
+    sy = max(0, (round(scaled_h) - height) // 2)
+    x0 = max(0, off_x); y0 = max(0, sy + off_y)
+    out_w = int(min(max_width, scaled_w - x0)); out_h = int(min(height, scaled_h - y0))
+    if out_w < 1 or out_h < 1: return None
+    src = QRectF(x0 / scale, y0 / scale, out_w / scale, out_h / scale).toAlignedRect() & QRect(0, 0, src_w, src_h)
+    return src, (out_w, out_h)
+
+def ntp_geometry(src_w, src_h, props, target=NTP_TARGET_SIZE):
+    """
+    (source rect to cut out, its (x, y, w, h) on the output canvas) for an NTP image on a
+    `target`-sized canvas, or None if it is entirely off-canvas.
+    """
+    tw, th = target
+    f = tw / REFERENCE_CANVAS[0] # reference canvas -> target pixels
+    scale, off_x, off_y = _props(props, max(tw / src_w, th / src_h))
+    if props: scale *= f
+    new_w, new_h = src_w * scale, src_h * scale
+    draw_x = (tw - new_w) / 2 + off_x * f; draw_y = (th - new_h) / 2 + off_y * f
+    visible = QRectF(draw_x, draw_y, new_w, new_h) & QRectF(0, 0, tw, th)
+    if visible.isEmpty(): return None
+    src = QRectF((visible.x() - draw_x) / scale, (visible.y() - draw_y) / scale, visible.width() / scale, visible.height() / scale)
+    src = src.toAlignedRect() & QRect(0, 0, src_w, src_h)
+    dst = visible.toAlignedRect() & QRect(0, 0, tw, th)
+    return src, (dst.x(), dst.y(), dst.width(), dst.height())
+
+def process_frame(img, props, max_width=FRAME_MAX_WIDTH, height=FRAME_STRIP_HEIGHT):
+    """The visible frame strip of `img`, or a null QImage if none of it is visible."""
+    geo = frame_geometry(img.width(), img.height(), props, max_width, height)
+    if geo is None: return QImage()
+    src, (out_w, out_h) = geo
+    return img.copy(src).scaled(out_w, out_h, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+
+def process_ntp(img, props, target=NTP_TARGET_SIZE):
+    """`img` placed on a transparent `target`-sized canvas as the preview places it (the NTP color shows around it)."""
+    geo = ntp_geometry(img.width(), img.height(), props, target)
+    if geo is None: return QImage()
+    src, (x, y, w, h) = geo
+    part = img.copy(src).scaled(w, h, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    if (x, y, w, h) == (0, 0) + tuple(target): return part # covers the whole canvas
+    out = QImage(target[0], target[1], QImage.Format_ARGB32_Premultiplied); out.fill(Qt.transparent)
+    p = QPainter(out); p.drawImage(x, y, part); p.end()
+    return out
+
+def output_size(key, src_w, src_h, props, ntp_target=NTP_TARGET_SIZE):
+    """Size of the processed export image for an image key, without processing it."""
+    if key == "ntp_image": return ntp_target
+    geo = frame_geometry(src_w, src_h, props)
+    return geo[1] if geo else (0, 0)
+
+def process(key, img, props, ntp_target=NTP_TARGET_SIZE):
+    return process_ntp(img, props, ntp_target) if key == "ntp_image" else process_frame(img, props)
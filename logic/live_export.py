@@ -0,0 +1,142 @@
+import os
+import json
+from PySide6.QtCore import QObject, QThreadPool, QTimer, QFileSystemWatcher, Signal
+from logic.theme_model import IMAGE_KEYS
+from logic.export_cache import ExportCache
+from logic.export_manager import ExportJob, IMAGE_OUTPUTS, build_manifest, transparent_overlay_png
+
+LIVE_EXPORT_DEBOUNCE_MS = 400 # a slider drag becomes one sync, not dozens
+
+def write_atomic(path, data):
+    """Writes `data` next to `path` and renames it into place, so readers never see a partial file."""
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f: f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+def image_signature(theme, key, ntp_size):
+    """Everything that decides the exported file for an image key; it is re-encoded only when this changes."""
+    path = theme[key]
+    try: st = os.stat(path); stamp = (st.st_mtime_ns, st.st_size)
+    except OSError: stamp = None
+    return (path, stamp, json.dumps(theme.get(f"{key}_properties"), sort_keys=True), tuple(ntp_size) if key == "ntp_image" else None)
+
+class LiveExportJob(ExportJob):
+    """One sync of an unpacked theme directory: changed images, then manifest.json if it changed, then stale images."""
+    def __init__(self, theme, export_data, sources, cache, encode_keys, signatures, present, manifest, strip_meta, ntp_size):
+        super().__init__(theme, export_data, export_data["meta_version"], sources, False, cache, strip_meta=strip_meta, ntp_size=ntp_size)
+        self.encode_keys = encode_keys
+        self.signatures = signatures # image_signature() of every image this sync leaves on disk
+        self.present = present # image key -> archive path already on disk and still current
+        self.manifest = manifest # manifest.json bytes last written
+        self.written = [] # relative paths written by this sync
+
+    def _write(self, name, data):
+        write_atomic(os.path.join(self.export_data["dest_path"], name), data); self.written.append(name)
+
+    def build(self):
+        out_dir = self.export_data["dest_path"]
+        os.makedirs(os.path.join(out_dir, "images"), exist_ok=True)
+        if not os.path.exists(os.path.join(out_dir, "images", "theme_frame_overlay.png")):
+            self._write("images/theme_frame_overlay.png", transparent_overlay_png())
+
+        encoded = self._encode_all(self.encode_keys)
+        for key in self.encode_keys:
+            self.present.pop(key, None)
+            if encoded[key] is None: continue # moved entirely out of view
+            name = "images/" + IMAGE_OUTPUTS[key][0]
+            self._write(name, encoded[key]); self.present[key] = name
+
+        self._step("Writing manifest", 90)
+        image_files = {key: self.present[key] for key in IMAGE_OUTPUTS if key in self.present} # stable order, stable bytes
+        manifest = json.dumps(build_manifest(self.theme, self.export_data, self.version, image_files), indent=4).encode("utf-8")
+        if manifest != self.manifest: self._write("manifest.json", manifest); self.manifest = manifest
+
+        for name, _ in IMAGE_OUTPUTS.values():
+            if "images/" + name in self.present.values(): continue
+            stale = os.path.join(out_dir, "images", name)
+            if os.path.exists(stale): os.remove(stale)
+        self.signals.progress.emit("Done", 100)
+        return out_dir
+
+class LiveExporter(QObject):
+    """Keeps an unpacked theme directory in sync with the edited theme; debounced, re-encoding only changed images."""
+    synced = Signal(str, list) # directory, relative paths written (empty if nothing changed)
+    failed = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self); self.pool.setMaxThreadCount(1)
+        self.cache = ExportCache()
+        self.timer = QTimer(self); self.timer.setSingleShot(True); self.timer.setInterval(LIVE_EXPORT_DEBOUNCE_MS)
+        self.timer.timeout.connect(self.sync)
+        # Editing a source image in another program counts as a change too
+        self.watcher = QFileSystemWatcher(self); self.watcher.fileChanged.connect(self.schedule)
+        self.theme = None; self.job = None; self.pending = False
+
+    def start(self, theme_data, export_data, p_settings, renderer):
+        """Starts mirroring `theme_data` (a ThemeModel) to the directory in export_data["dest_path"]."""
+        self.stop()
+        self.theme = theme_data; self.export_data = dict(export_data)
+        self.p_settings = p_settings; self.renderer = renderer
+        self.signatures = {} # image key -> image_signature() of the file on disk
+        self.present = {}; self.manifest = None
+        self.theme.subscribe(self.on_theme_changed)
+        self.sync()
+
+    def stop(self):
+        if self.theme is None: return
+        self.theme.unsubscribe(self.on_theme_changed); self.theme = None
+        self.timer.stop(); self.pending = False
+        if self.watcher.files(): self.watcher.removePaths(self.watcher.files())
+        if self.job is not None: self.job.cancel()
+
+    def wait(self, msecs=-1): return self.pool.waitForDone(msecs)
+
+    def on_theme_changed(self, changed): self.schedule()
+
+    def schedule(self, *_):
+        if self.theme is not None: self.timer.start()
+
+    def sync(self):
+        if self.theme is None: return
+        if self.job is not None: self.pending = True; return # runs again when the current sync is done
+        theme = self.theme.copy(); ntp_size = self.p_settings.get_ntp_export_size()
+        keys = [key for key in IMAGE_OUTPUTS if theme.get(key)]
+        signatures = {key: image_signature(theme, key, ntp_size) for key in keys}
+        encode_keys = [key for key in keys if self.signatures.get(key) != signatures[key]]
+        present = {key: name for key, name in self.present.items() if key in signatures and key not in encode_keys}
+
+        watched = {theme[key] for key in keys if os.path.exists(theme[key])}
+        stale = [p for p in self.watcher.files() if p not in watched]
+        if stale: self.watcher.removePaths(stale)
+        if watched - set(self.watcher.files()): self.watcher.addPaths(list(watched - set(self.watcher.files())))
+
+        sources = {key: self.renderer.store.images.peek(theme[key]) for key in encode_keys if key in IMAGE_KEYS}
+        self.job = LiveExportJob(theme, self.export_data, sources, self.cache, encode_keys, signatures, present, self.manifest,
+                                 self.p_settings.get_strip_meta(), ntp_size)
+        self.job.signals.finished.connect(self._on_finished)
+        self.job.signals.failed.connect(self._on_failed)
+        self.job.signals.cancelled.connect(self._on_cancelled)
+        self.pool.start(self.job)
+
+    def _on_finished(self, fmt, path):
+        job, self.job = self.job, None
+        if self.theme is None or job.export_data is not self.export_data: self._next(); return # stopped or restarted meanwhile
+        self.signatures = job.signatures; self.present = job.present; self.manifest = job.manifest
+        self.synced.emit(path, job.written)
+        self._next()
+
+    def _on_failed(self, message):
+        self.job = None
+        self.signatures = {} # the directory is in an unknown state: rewrite everything next time
+        self.present = {}; self.manifest = None
+        if self.theme is not None: self.failed.emit(message); self._next()
+
+    def _on_cancelled(self): self.job = None; self._next()
+
+    def _next(self):
+        if self.pending: self.pending = False; self.timer.start()
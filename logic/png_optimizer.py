@@ -0,0 +1,76 @@
+"""Lossless PNG size optimization: tries palette, grayscale and opaque copies at several zlib levels and keeps the smallest."""
+import time
+import struct
+from PySide6.QtGui import QImage
+from PySide6.QtCore import QByteArray, QBuffer, QIODevice, Qt
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+KEEP_ANCILLARY = {b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"cICP", b"sBIT"}
+LEVELS = (9, 6) # zlib levels tried for every lossless variant
+PALETTE_SAMPLE_STEP = 97 # a sparse sample with >256 colors rules a palette out cheaply
+
+def encode_png(img, level=-1):
+    """PNG bytes for a QImage at zlib `level` (0-9, -1 for Qt's default), or None if encoding failed."""
+    quality = -1 if level < 0 else 100 - (level * 91 + 8) // 9 # Qt maps quality q to level (100 - q) * 9 // 91
+    data = QByteArray(); buf = QBuffer(data); buf.open(QIODevice.WriteOnly)
+    ok = img.save(buf, "PNG", quality); buf.close()
+    return bytes(data) if ok else None
+
+def strip_chunks(png):
+    """Drops ancillary chunks that don't affect how the image looks."""
+    if not png.startswith(PNG_SIGNATURE): return png
+    out = [PNG_SIGNATURE]; pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(png):
+        length, ctype = struct.unpack(">I4s", png[pos:pos + 8])
+        end = pos + 12 + length
+        if ctype[0] & 0x20 == 0 or ctype in KEEP_ANCILLARY: out.append(png[pos:end]) # uppercase first letter: critical
+        pos = end
+    return b"".join(out)
+
+def _same_pixels(candidate, img):
+    return candidate.convertToFormat(img.format()) == img
+
+def _palette(img):
+    """An exact Indexed8 copy of `img`, or None if it has more than 256 colors."""
+    flags = Qt.ThresholdDither | Qt.AvoidDither
+    if not img.hasAlphaChannel():
+        pal = img.convertToFormat(QImage.Format_Indexed8, flags) # Qt keeps the exact colors when there are <= 256
+        return pal if _same_pixels(pal, img) else None
+    argb = img.convertToFormat(QImage.Format_ARGB32)
+    if argb.bytesPerLine() != argb.width() * 4: return None
+    pixels = memoryview(argb.constBits()).cast("I")
+    if len(set(pixels[::PALETTE_SAMPLE_STEP])) > 256: return None
+    colors = set(pixels)
+    if len(colors) > 256: return None
+    pal = argb.convertToFormat(QImage.Format_Indexed8, sorted(colors), flags)
+    return pal if _same_pixels(pal, img) else None
+
+def lossless_variants(img):
+    """Yields smaller-format copies of `img` that hold exactly the same pixels (palette first: usually smallest)."""
+    pal = _palette(img)
+    if pal is not None: yield pal
+    if img.hasAlphaChannel():
+        rgb = img.convertToFormat(QImage.Format_RGB32)
+        if not _same_pixels(rgb, img): return # has real transparency
+        img = rgb; yield rgb
+    if not img.isGrayscale(): return
+    gray = img.convertToFormat(QImage.Format_Grayscale8)
+    if _same_pixels(gray, img): yield gray
+
+def optimize_png(img, data, strip=True, deadline=None):
+    """
+    Smallest lossless encoding of `img` found before `deadline` (a time.monotonic() value).
+    `data` is its default encoding, which is also the fallback. Returns (bytes, finished).
+    """
+    best = strip_chunks(data) if strip else data
+    def candidates():
+        for variant in lossless_variants(img):
+            for level in LEVELS: yield variant, level
+        yield img, 9
+    for variant, level in candidates():
+        if deadline is not None and time.monotonic() > deadline: return best, False
+        png = encode_png(variant, level)
+        if png is None: continue
+        if strip: png = strip_chunks(png)
+        if len(png) < len(best): best = png
+    return best, True
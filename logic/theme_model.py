@@ -0,0 +1,117 @@
+from logic.theme_state import ThemeState
+
+# Single source of truth for the editable theme keys and their default values
+DEFAULT_THEME = {
+    "frame": "#CC0000FF", "toolbar": "#FFFFFFFF", "tab_text": "#000000FF",
+    "active_tab": "#FFFFFFFF", "inactive_tab": "#E68A8AFF", "inactive_tab_text": "#555555FF",
+    "button_tint": "#555555FF", "bookmark_text": "#555555FF", "toolbar_text": "#333333FF",
+    "ntp_background": "#FFFFFFFF",
+    "omnibox_background": "#F0F0F0FF", "omnibox_text": "#000000FF",
+    "omnibox_background_incognito": "#3C4043FF", "omnibox_text_incognito": "#E8EAEDFF",
+    "ntp_image": None, "frame_image": None, "img_scale": 100, "img_off_x": 0, "img_off_y": 0,
+    "frame_incognito": "#2B2E31FF", "inactive_tab_incognito": "#3C4043FF", "frame_image_incognito": None
+}
+IMAGE_KEYS = ("frame_image", "ntp_image", "frame_image_incognito")
+DELETED = object() # a key that didn't exist, in history deltas and journal records
+COLOR_KEYS = frozenset(k for k, v in DEFAULT_THEME.items() if isinstance(v, str)) | {"frame_incognito_inactive"}
+DEFAULT_STATE = ThemeState.from_dict(DEFAULT_THEME)
+
+def parse_rgba_hex(text):
+    """Returns (r, g, b, a) for a '#RRGGBBAA' string, or None when it is malformed."""
+    if not isinstance(text, str) or len(text) != 9 or not text.startswith("#"): return None
+    try: return (int(text[1:3], 16), int(text[3:5], 16), int(text[5:7], 16), int(text[7:9], 16))
+    except ValueError: return None
+
+class ThemeModel:
+    """The editable theme: a dict-like view of an immutable ThemeState with validated, pre-parsed colors.
+    Subscribers are told which keys changed."""
+    __slots__ = ("_state", "_rgba", "_listeners")
+
+    def __init__(self, data=None):
+        self._state = DEFAULT_STATE
+        self._rgba = {k: parse_rgba_hex(v) for k, v in DEFAULT_THEME.items() if k in COLOR_KEYS}
+        self._listeners = []
+        if data: self.update(data)
+
+    # --- Change Notifications ---
+    def subscribe(self, callback):
+        """`callback(changed_keys)` runs after every write that changed at least one key."""
+        self._listeners.append(callback)
+    def unsubscribe(self, callback):
+        if callback in self._listeners: self._listeners.remove(callback)
+    def _notify(self, changed):
+        if changed:
+            for cb in list(self._listeners): cb(frozenset(changed))
+
+    # --- Validation ---
+    @staticmethod
+    def _validate(key, value):
+        if key in COLOR_KEYS:
+            if value is None: return None
+            rgba = parse_rgba_hex(value)
+            if rgba is None: raise ValueError(f"Invalid color for '{key}': {value!r} (expected #RRGGBBAA)")
+            return rgba
+        if key in IMAGE_KEYS and value is not None and not isinstance(value, str):
+            raise ValueError(f"Invalid image path for '{key}': {value!r}")
+        if key.endswith("_properties") and value is not None and not isinstance(value, dict):
+            raise ValueError(f"Invalid image properties for '{key}': {value!r}")
+        return None
+
+    def _store(self, key, value):
+        if key in self._state and self._state[key] == value: return False
+        rgba = self._validate(key, value)
+        self._state = self._state.set(key, value)
+        if key in COLOR_KEYS: self._rgba[key] = rgba
+        return True
+
+    # --- Mapping Interface ---
+    def __getitem__(self, key): return self._state[key]
+    def get(self, key, default=None): return self._state.get(key, default)
+    def __contains__(self, key): return key in self._state
+    def __iter__(self): return iter(self._state)
+    def __len__(self): return len(self._state)
+    def keys(self): return self._state.keys()
+    def values(self): return self._state.values()
+    def items(self): return self._state.items()
+
+    def __setitem__(self, key, value):
+        if self._store(key, value): self._notify((key,))
+
+    def __delitem__(self, key):
+        if key not in self._state: raise KeyError(key)
+        self._state = self._state.delete(key); self._rgba.pop(key, None)
+        self._notify((key,))
+
+    def update(self, data):
+        # Validate everything first so a bad import leaves the model untouched
+        for k, v in data.items(): self._validate(k, v)
+        self._notify([k for k, v in data.items() if self._store(k, v)])
+
+    def replace(self, data):
+        """Makes the model hold exactly `data`: a ThemeState (e.g. from snapshot() or undo) or a dict."""
+        state = data if isinstance(data, ThemeState) else ThemeState.from_dict(data)
+        changed = self._state.diff(state)
+        rgba = {k: self._validate(k, state[k]) for k in changed if k in state} # before anything is touched
+        for k in changed:
+            if k not in state: self._rgba.pop(k, None)
+            elif k in COLOR_KEYS: self._rgba[k] = rgba[k]
+        self._state = state
+        self._notify(changed)
+
+    def reset(self): self.replace(DEFAULT_STATE)
+
+    def snapshot(self):
+        """The current state; immutable, so it stays valid while the model keeps changing."""
+        return self._state
+
+    def copy(self):
+        """Detached copy of the model (no subscribers)."""
+        clone = ThemeModel.__new__(ThemeModel)
+        clone._state = self._state; clone._rgba = dict(self._rgba); clone._listeners = []
+        return clone
+
+    # --- Parsed Colors ---
+    def rgba(self, key):
+        """Parsed (r, g, b, a) for a color key, falling back to its default when unset."""
+        rgba = self._rgba.get(key)
+        return rgba if rgba is not None else parse_rgba_hex(DEFAULT_THEME.get(key))
@@ -0,0 +1,64 @@
+"""Immutable theme state: keeping one is a reference, and diff() tells which keys changed between two."""
+_MISSING = object()
+
+class ThemeState:
+    """An immutable mapping; set()/delete()/update() return a new state (copy-on-write) and leave this one as it is."""
+    __slots__ = ("_data",)
+
+    def __init__(self, data=None): self._data = dict(data) if data else {}
+
+    @classmethod
+    def from_dict(cls, data): return cls(data)
+
+    @classmethod
+    def _wrap(cls, data):
+        state = cls.__new__(cls); state._data = data
+        return state
+
+    def __getitem__(self, key): return self._data[key]
+    def get(self, key, default=None): return self._data.get(key, default)
+    def __contains__(self, key): return key in self._data
+    def __len__(self): return len(self._data)
+    def __iter__(self): return iter(self._data)
+    def keys(self): return self._data.keys()
+    def values(self): return self._data.values()
+    def items(self): return self._data.items()
+
+    def __eq__(self, other):
+        if isinstance(other, ThemeState): return self is other or not self.changes(other)
+        if isinstance(other, dict): return self._data == other
+        return NotImplemented
+    __hash__ = None
+
+    def __repr__(self): return f"ThemeState({self._data!r})"
+
+    def set(self, key, value):
+        if self._data.get(key, _MISSING) is value: return self
+        data = dict(self._data); data[key] = value
+        return self._wrap(data)
+
+    def delete(self, key):
+        if key not in self._data: return self
+        data = dict(self._data); del data[key]
+        return self._wrap(data)
+
+    def update(self, data):
+        changed = {k: v for k, v in data.items() if self._data.get(k, _MISSING) is not v}
+        return self._wrap({**self._data, **changed}) if changed else self
+
+    def changes(self, other, missing=None):
+        """{key: (value here, value in `other`)} for keys added, removed or changed; `missing` stands in for an absent key."""
+        a, b = self._data, other._data
+        if a is b: return {}
+        # Values are replaced on edit, never mutated, so identical values are skipped without comparing them
+        out = {}
+        for key, old in a.items():
+            new = b.get(key, _MISSING)
+            if old is not new and (new is _MISSING or old != new): out[key] = (old, missing if new is _MISSING else new)
+        for key, new in b.items():
+            if key not in a: out[key] = (missing, new)
+        return out
+
+    def diff(self, other):
+        """Keys added, removed or changed between the two states."""
+        return frozenset(self.changes(other))
@@ -1,12 +1,20 @@
 import sys
-from PySide6.QtWidgets import QApplication
-from ui.window.main_window import MainWindow
+import multiprocessing
 
 def main():
+    # Headless batch export: main.py export --input DIR --out DIR [--jobs N]
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        from logic.batch_export import run
+        sys.exit(run(sys.argv[2:]))
+
+    from PySide6.QtWidgets import QApplication
+    from ui.window.main_window import MainWindow
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    window.restore_or_start_session()
     sys.exit(app.exec())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    multiprocessing.freeze_support() # export worker processes in the frozen .exe
+    main()
@@ -0,0 +1,108 @@
+import os
+from collections import OrderedDict
+from PySide6.QtGui import QImage
+from PySide6.QtCore import Qt
+
+def image_bytes(pix):
+    """Approximate memory held by a QImage/QPixmap."""
+    if pix is None or pix.isNull(): return 0
+    return pix.width() * pix.height() * max(1, pix.depth() // 8)
+
+class ScaledImageCache:
+    """
+    LRU cache of scaled copies of source images, keyed by (path, size, transform mode).
+    Evicts least recently used entries once the byte budget is exceeded.
+    """
+    def __init__(self, max_bytes=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.current_bytes = 0
+
+    def get(self, path, source, width, height, transform=Qt.SmoothTransformation):
+        key = (path, width, height, transform)
+        scaled = self._entries.get(key)
+        if scaled is not None:
+            self._entries.move_to_end(key)
+            return scaled
+        scaled = source.scaled(width, height, Qt.KeepAspectRatio, transform)
+        self._entries[key] = scaled; self.current_bytes += image_bytes(scaled)
+        self._evict()
+        return scaled
+
+    def discard(self, key):
+        scaled = self._entries.pop(key, None)
+        if scaled is not None: self.current_bytes -= image_bytes(scaled)
+
+    def invalidate(self, path=None):
+        """Drops every scaled copy of `path`, or everything when no path is given."""
+        for key in [k for k in self._entries if path is None or k[0] == path]: self.discard(key)
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, scaled = self._entries.popitem(last=False)
+            self.current_bytes -= image_bytes(scaled)
+
+    def __len__(self): return len(self._entries)
+
+class SourceImageCache:
+    """
+    LRU cache of decoded source images bounded by a byte budget.
+    Entries are keyed on path and revalidated against the file's mtime and size,
+    so an image edited on disk is reloaded on its next use.
+    """
+    def __init__(self, max_bytes=256 * 1024 * 1024, on_stale=None):
+        self.max_bytes = max_bytes
+        self.on_stale = on_stale # called with the path when a cached decode is dropped as out of date
+        self._entries = OrderedDict() # path -> (stamp, image)
+        self.current_bytes = 0
+        self.hits = 0; self.misses = 0; self.evictions = 0
+
+    @staticmethod
+    def file_stamp(path):
+        try: st = os.stat(path)
+        except OSError: return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self, path):
+        """Cached decode of `path`, decoding it synchronously on a miss."""
+        img = self.peek(path)
+        if img is None: img = self.put(path, QImage(path))
+        return img
+
+    def peek(self, path):
+        """Cached decode of `path` if it is still current, else None (counted as a miss)."""
+        entry = self._entries.get(path)
+        if entry is not None:
+            if entry[0] == self.file_stamp(path):
+                self.hits += 1; self._entries.move_to_end(path)
+                return entry[1]
+            self.discard(path)
+            if self.on_stale: self.on_stale(path)
+        self.misses += 1
+        return None
+
+    def put(self, path, img):
+        """Stores an image decoded elsewhere (e.g. on a loader thread); null images are kept as failed decodes."""
+        self.discard(path)
+        self._entries[path] = (self.file_stamp(path), img); self.current_bytes += image_bytes(img)
+        self._evict()
+        return img
+
+    def discard(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None: self.current_bytes -= image_bytes(entry[1])
+
+    def clear(self):
+        self._entries.clear(); self.current_bytes = 0
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.current_bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, pix) = self._entries.popitem(last=False)
+            self.current_bytes -= image_bytes(pix); self.evictions += 1
+
+    def __contains__(self, path): return path in self._entries
+    def __len__(self): return len(self._entries)
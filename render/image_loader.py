@@ -0,0 +1,63 @@
+import itertools
+from PySide6.QtGui import QImage, QImageReader
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Qt, Signal
+
+class _DecodeSignals(QObject):
+    finished = Signal(int, str, QImage, QImage)
+
+class _DecodeTask(QRunnable):
+    def __init__(self, token, path, thumb_size, signals):
+        super().__init__()
+        self.setAutoDelete(False) # the loader keeps the task so it can still be cancelled
+        self.token = token; self.path = path; self.thumb_size = thumb_size; self.signals = signals
+        self.cancelled = False
+
+    def run(self):
+        if self.cancelled: return
+        img = QImageReader(self.path).read()
+        if self.cancelled: return
+        thumb = QImage()
+        if self.thumb_size is not None and not img.isNull():
+            thumb = img.scaled(self.thumb_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.signals.finished.emit(self.token, self.path, img, thumb)
+
+class ImageLoader(QObject):
+    """
+    Decodes images into QImage on a background thread pool.
+    Requests are grouped by slot: a new request for a slot cancels the previous one,
+    so a stale decode never reaches its callback after the user picked another file.
+    """
+    def __init__(self, parent=None, max_threads=2):
+        super().__init__(parent)
+        self.pool = QThreadPool(self); self.pool.setMaxThreadCount(max_threads)
+        self._signals = _DecodeSignals(); self._signals.finished.connect(self._on_finished)
+        self._tokens = itertools.count(1)
+        self._slots = {} # slot -> (token, task, callback)
+
+    def request(self, slot, path, callback, thumb_size=None):
+        """
+        Decodes `path` and calls `callback(path, image, thumbnail)` on the GUI thread; a null image
+        means it failed. The thumbnail is only made (on the worker) when `thumb_size` is given.
+        """
+        self.cancel(slot)
+        token = next(self._tokens)
+        task = _DecodeTask(token, path, thumb_size, self._signals)
+        self._slots[slot] = (token, task, callback)
+        self.pool.start(task)
+
+    def cancel(self, slot):
+        entry = self._slots.pop(slot, None)
+        if entry is None: return
+        entry[1].cancelled = True
+        self.pool.tryTake(entry[1]) # still queued: never runs
+
+    def wait(self, msecs=-1):
+        """Blocks until queued decodes finish (their callbacks still run from the event loop)."""
+        return self.pool.waitForDone(msecs)
+
+    def _on_finished(self, token, path, img, thumb):
+        for slot, (t, _, callback) in list(self._slots.items()):
+            if t == token:
+                del self._slots[slot]
+                callback(path, img, thumb)
+                return
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from PySide6.QtGui import QImageReader
+from PySide6.QtCore import QSize
+from render.image_cache import SourceImageCache
+from render.image_loader import ImageLoader
+
+class ImageStore:
+    """Shared decoded images, thumbnails and dimensions, so each imported file is decoded once."""
+    THUMB_SIZE = QSize(520, 260) # 2x the mini preview
+    MAX_SIZES = 1024 # remembered image dimensions
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, thumb_bytes=32 * 1024 * 1024):
+        self.images = SourceImageCache(max_bytes)
+        self.thumbs = SourceImageCache(thumb_bytes) # ~60 thumbnails, so auditioning wallpapers doesn't grow memory
+        self.loader = ImageLoader()
+        self._sizes = OrderedDict() # path -> (stamp, QSize), least recently used first
+        self._waiters = {} # path -> {owner: callback} for decodes in flight
+
+    def request(self, owner, path, callback):
+        """
+        Calls `callback(path, image)` with the full decode, right away if it is cached, else on
+        the GUI thread once the background decode lands. A newer request from the same owner
+        supersedes this one; a decode nobody waits for any more is cancelled.
+        """
+        self.cancel(owner)
+        img = self.images.peek(path)
+        if img is not None: callback(path, img); return
+        waiters = self._waiters.setdefault(path, {})
+        waiters[owner] = callback
+        if len(waiters) == 1:
+            self.loader.request(path, path, self._on_decoded, self.THUMB_SIZE)
+
+    def cancel(self, owner):
+        for path, waiters in list(self._waiters.items()):
+            if waiters.pop(owner, None) is not None and not waiters:
+                del self._waiters[path]; self.loader.cancel(path)
+
+    def thumbnail(self, path):
+        """Small copy of a decoded image for previews, or None when it has not been decoded."""
+        return self.thumbs.peek(path)
+
+    def size(self, path):
+        """Image dimensions, from the decode or the cached header read (an invalid QSize if unreadable)."""
+        stamp = SourceImageCache.file_stamp(path)
+        entry = self._sizes.get(path)
+        if entry is None or entry[0] != stamp:
+            entry = (stamp, QImageReader(path).size() if stamp is not None else QSize())
+        self._remember_size(path, entry)
+        return entry[1]
+
+    def _remember_size(self, path, entry):
+        self._sizes[path] = entry; self._sizes.move_to_end(path)
+        if len(self._sizes) > self.MAX_SIZES: self._sizes.popitem(last=False)
+
+    def _on_decoded(self, path, img, thumb):
+        self.images.put(path, img); self.thumbs.put(path, thumb)
+        if not img.isNull(): self._remember_size(path, (SourceImageCache.file_stamp(path), img.size()))
+        for callback in self._waiters.pop(path, {}).values(): callback(path, img)
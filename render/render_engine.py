@@ -0,0 +1,352 @@
+from PySide6.QtGui import QImage, QPainter, QColor, QFont, QFontMetrics, QRegion, QStaticText, QTransform
+from PySide6.QtCore import Qt, QRect, QPointF
+from render.image_cache import ScaledImageCache, SourceImageCache
+from logic.theme_model import ThemeModel, DEFAULT_THEME, IMAGE_KEYS, parse_rgba_hex
+
+# theme_data keys feeding each preview layer. The UI layer is further split into the
+# regions of the mock browser, in paint order, so an edit only repaints what it touches.
+NTP_LAYER_KEYS = ("ntp_background", "ntp_image", "ntp_image_properties")
+UI_REGION_KEYS = {
+    "frame": ("frame", "frame_incognito", "frame_image", "frame_image_properties", "frame_image_incognito", "frame_image_incognito_properties"),
+    "tab_strip": ("active_tab", "inactive_tab", "inactive_tab_incognito", "tab_text", "inactive_tab_text"),
+    "toolbar": ("toolbar", "button_tint"),
+    "omnibox": ("omnibox_background", "omnibox_text", "omnibox_background_incognito", "omnibox_text_incognito"),
+    "bookmarks": ("bookmark_text",),
+}
+UI_REGIONS = tuple(UI_REGION_KEYS)
+
+def _freeze(value):
+    # Property dicts are compared by value, never by identity
+    return tuple(sorted(value.items())) if isinstance(value, dict) else value
+
+def ui_metrics(w, browser_mode):
+    """Logical geometry of the mock browser chrome for a canvas of width `w`."""
+    frame_h = 56 if browser_mode != "Edge" else 48
+    tabs_h = 38; toolbar_h = 44
+    tabs_y = frame_h; toolbar_y = tabs_y + tabs_h
+    return {
+        "frame_h": frame_h, "tabs_h": tabs_h, "top_area_h": frame_h + tabs_h, "toolbar_h": toolbar_h,
+        "tabs_y": tabs_y, "toolbar_y": toolbar_y,
+        "url_rect": QRect(70, toolbar_y + 8, w - 140, toolbar_h - 16),
+    }
+
+class RenderEngine:
+    """Widget-independent preview renderer (works offscreen). Layer images are reused in place; copy them to keep them."""
+    def __init__(self, source_cache=None):
+        self.interactive = False # fast transforms while a control is being dragged
+        self.scaled_cache = ScaledImageCache(); self._scaled_keys = {}
+        # Decoded sources may be shared with other consumers (see ImageStore)
+        self.source_cache = SourceImageCache() if source_cache is None else source_cache
+        self.source_cache.on_stale = self.scaled_cache.invalidate
+        # Revisions let callers skip re-uploading layers that did not change
+        self.ntp_revision = 0; self.ui_revision = 0
+        self._text_cache = {} # (browser_mode, dpr) -> fonts, metrics and prepared QStaticText layouts
+        # Optional `async_loader(mode, path)`: uncached images are then decoded in the background and
+        # drawn as placeholders until image_loaded() delivers them
+        self.async_loader = None
+        self._pending = {} # image key -> path being decoded
+        self.invalidate()
+
+    def invalidate(self):
+        """Drops all cached layer output so the next render rebuilds everything."""
+        # Dirty tracking: last rendered layer output and the inputs it was built from.
+        # Output drawn in interactive mode is marked fast so it is redrawn at full quality afterwards.
+        # For a ThemeModel the ThemeState each layer was drawn from is kept too, and diffed against the next one.
+        self._ntp_img = None; self._ntp_sig = None; self._ntp_fast = False; self._ntp_state = None
+        self._ui_img = None; self._ui_layout_key = None; self._ui_region_sigs = {}; self._ui_fast_regions = set(); self._ui_state = None
+
+    def render(self, theme, browser_mode="Chrome", incognito=False, size=(1000, 562), dpr=1.0):
+        """Renders the full preview (NTP + browser UI) and returns a new QImage."""
+        ntp = self.render_ntp_layer(theme, incognito, size, dpr)
+        ui = self.render_ui_layer(theme, browser_mode, incognito, size, dpr)
+        out = QImage(ui.size(), QImage.Format_ARGB32_Premultiplied); out.setDevicePixelRatio(dpr); out.fill(Qt.transparent)
+        p = QPainter(out)
+        if ntp is not None: p.drawImage(0, 0, ntp)
+        p.drawImage(0, 0, ui); p.end()
+        return out
+
+    def image_loaded(self, path, img):
+        """Completion callback for `async_loader`: caches the decode so the next render draws it."""
+        self._pending = {k: p for k, p in self._pending.items() if p != path}
+        self.source_cache.put(path, img)
+
+    @staticmethod
+    def color(theme, key):
+        """QColor for `key`; plain dicts are parsed on the fly, a ThemeModel is already parsed."""
+        if isinstance(theme, ThemeModel): return QColor(*theme.rgba(key))
+        rgba = parse_rgba_hex(theme.get(key)) or parse_rgba_hex(DEFAULT_THEME[key])
+        return QColor(*rgba)
+
+    # ─── Helpers ───
+
+    def _inputs_signature(self, theme, keys):
+        # A ThemeModel's values are compared through _changed_keys(); a plain dict's go into the signature
+        sig = () if isinstance(theme, ThemeModel) else tuple(_freeze(theme.get(k)) for k in keys)
+        # Source files edited on disk invalidate the layers drawing them, as does a background decode landing
+        is_async = self.async_loader is not None
+        sig += tuple((SourceImageCache.file_stamp(theme[k]), is_async and theme[k] in self.source_cache) for k in keys if k in IMAGE_KEYS and theme.get(k))
+        return sig
+
+    @staticmethod
+    def _changed_keys(last, theme):
+        """(state, keys changed since the `last` rendered state); None for everything, empty for a plain dict."""
+        if not isinstance(theme, ThemeModel): return None, frozenset()
+        state = theme.snapshot()
+        return state, (None if last is None else last.diff(state))
+
+    def _source(self, mode, path):
+        if self.async_loader is None: return self.source_cache.get(path)
+        img = self.source_cache.peek(path)
+        if img is None:
+            if self._pending.get(mode) != path:
+                self._pending[mode] = path; self.async_loader(mode, path)
+            return QImage() # placeholder: the layer is drawn without the image for now
+        return img
+
+    def _new_image(self, w, h, dpr):
+        img = QImage(max(1, round(w * dpr)), max(1, round(h * dpr)), QImage.Format_ARGB32_Premultiplied)
+        img.setDevicePixelRatio(dpr)
+        return img
+
+    def _transform(self): return Qt.FastTransformation if self.interactive else Qt.SmoothTransformation
+
+    def _set_quality_hints(self, p):
+        p.setRenderHint(QPainter.Antialiasing); p.setRenderHint(QPainter.SmoothPixmapTransform, not self.interactive)
+
+    def _scaled(self, mode, path, img, width, height):
+        transform = self._transform()
+        key = (path, width, height, transform)
+        old = self._scaled_keys.get(mode); self._scaled_keys[mode] = key
+        # Properties changed: the previous size of this image will not be drawn again
+        if old is not None and old != key and old not in self._scaled_keys.values(): self.scaled_cache.discard(old)
+        return self.scaled_cache.get(path, img, width, height, transform)
+
+    def _region_rects(self, w, m):
+        return {
+            "frame": QRect(0, 0, w, m["top_area_h"]),
+            "tab_strip": QRect(0, m["tabs_y"], w, m["tabs_h"] + 5), # Chrome's active tab overhangs the toolbar
+            "toolbar": QRect(0, m["toolbar_y"], w, m["toolbar_h"]),
+            "omnibox": QRect(m["url_rect"]),
+            "bookmarks": QRect(0, m["toolbar_y"] + m["toolbar_h"], w, 30),
+        }
+
+    # ─── NTP Layer ───
+
+    def render_ntp_layer(self, theme, incognito, size, dpr=1.0):
+        """Returns the New Tab Page layer, or None in incognito where it is not shown."""
+        if incognito: return None
+
+        mode = "ntp_image"
+        canvas_w, canvas_h = size
+
+        state, changed = self._changed_keys(self._ntp_state, theme)
+        sig = (canvas_w, canvas_h, dpr) + self._inputs_signature(theme, NTP_LAYER_KEYS)
+        if sig == self._ntp_sig and self._ntp_img is not None and (self.interactive or not self._ntp_fast) and changed is not None and changed.isdisjoint(NTP_LAYER_KEYS):
+            return self._ntp_img
+
+        # 1. Prepare Background Color
+        col_bg = self.color(theme, "ntp_background")
+
+        target = self._new_image(canvas_w, canvas_h, dpr)
+        target.fill(col_bg)
+
+        # 2. Draw NTP Image
+        path = theme.get(mode)
+        if path:
+            img = self._source(mode, path)
+            if not img.isNull():
+                props = theme.get(mode + "_properties")
+                if props:
+                    scale = props.get('scale', 100) / 100.0; off_x = props.get('x', 0); off_y = props.get('y', 0)
+                else:
+                    scale = max(canvas_w / img.width(), canvas_h / img.height()); off_x = 0; off_y = 0
+
+                new_w = max(1, int(img.width() * scale)); new_h = max(1, int(img.height() * scale))
+                scaled = self._scaled(mode, path, img, max(1, round(new_w * dpr)), max(1, round(new_h * dpr)))
+                scaled.setDevicePixelRatio(dpr)
+
+                draw_x = (canvas_w - new_w) // 2 + off_x; draw_y = (canvas_h - new_h) // 2 + off_y
+
+                p = QPainter(target); self._set_quality_hints(p)
+                p.drawImage(int(draw_x), int(draw_y), scaled); p.end()
+
+        self._ntp_img = target; self._ntp_sig = sig; self._ntp_fast = self.interactive; self._ntp_state = state
+        self.ntp_revision += 1
+        return target
+
+    # ─── UI Layer ───
+
+    def render_ui_layer(self, theme, browser_mode, incognito, size, dpr=1.0):
+        """Returns the browser chrome layer, repainting only the regions whose inputs changed."""
+        w, h = size
+
+        layout_key = (w, h, dpr, browser_mode, incognito)
+        state, changed = self._changed_keys(self._ui_state, theme)
+        sigs = {r: self._inputs_signature(theme, UI_REGION_KEYS[r]) for r in UI_REGIONS}
+        if self._ui_img is None or layout_key != self._ui_layout_key or changed is None:
+            dirty = UI_REGIONS
+            if self._ui_img is None or layout_key != self._ui_layout_key: self._ui_img = self._new_image(w, h, dpr)
+            self._ui_img.fill(Qt.transparent)
+        else:
+            dirty = [r for r in UI_REGIONS if not changed.isdisjoint(UI_REGION_KEYS[r]) or sigs[r] != self._ui_region_sigs.get(r)
+                     or (r in self._ui_fast_regions and not self.interactive)]
+            if not dirty: return self._ui_img
+
+        m = ui_metrics(w, browser_mode)
+        m["w"] = w; m["dpr"] = dpr; m["browser_mode"] = browser_mode; m["is_incognito"] = incognito
+        rects = self._region_rects(w, m)
+        clip = QRegion()
+        for r in dirty: clip = clip.united(rects[r])
+
+        p = QPainter(self._ui_img)
+        p.setClipRegion(clip)
+        p.setCompositionMode(QPainter.CompositionMode_Source); p.fillRect(clip.boundingRect(), Qt.transparent)
+        p.setCompositionMode(QPainter.CompositionMode_SourceOver)
+        self._set_quality_hints(p)
+
+        # Regions overlapping the dirty area are repainted in order, clipped to it
+        painters = {
+            "frame": self._paint_frame, "tab_strip": self._paint_tab_strip, "toolbar": self._paint_toolbar,
+            "omnibox": self._paint_omnibox, "bookmarks": self._paint_bookmarks,
+        }
+        for r in UI_REGIONS:
+            if clip.intersects(rects[r]): painters[r](p, theme, m)
+        p.end()
+
+        self._ui_layout_key = layout_key; self._ui_region_sigs = sigs; self._ui_state = state
+        self._ui_fast_regions = (self._ui_fast_regions | set(dirty)) if self.interactive else (self._ui_fast_regions - set(dirty))
+        self.ui_revision += 1
+        return self._ui_img
+
+    # ─── Text ───
+
+    def _text_set(self, browser_mode, dpr):
+        key = (browser_mode, dpr)
+        ts = self._text_cache.get(key)
+        if ts is None:
+            font = QFont("Segoe UI", 9); bold = QFont("Segoe UI", 9, QFont.Bold)
+            ts = {"font": font, "bold": bold, "fm": QFontMetrics(font), "fm_bold": QFontMetrics(bold),
+                  "transform": QTransform.fromScale(dpr, dpr), "static": {}}
+            self._text_cache[key] = ts
+        return ts
+
+    def _draw_label(self, p, ts, x, baseline, text, bold=False):
+        """Draws one of the preview's constant strings from a cached, pre-shaped layout."""
+        font = ts["bold"] if bold else ts["font"]
+        st = ts["static"].get((text, bold))
+        if st is None:
+            st = QStaticText(text); st.setTextFormat(Qt.PlainText); st.setPerformanceHint(QStaticText.AggressiveCaching)
+            st.prepare(ts["transform"], font)
+            ts["static"][(text, bold)] = st
+        p.setFont(font)
+        p.drawStaticText(QPointF(x, baseline - (ts["fm_bold"] if bold else ts["fm"]).ascent()), st)
+
+    def _paint_frame(self, p, theme, m):
+        w = m["w"]; dpr = m["dpr"]; is_incognito = m["is_incognito"]; top_area_h = m["top_area_h"]
+        col_frame = self.color(theme, "frame_incognito" if is_incognito else "frame")
+
+        # 1. Background Color for Top Area
+        p.fillRect(0, 0, w, top_area_h, col_frame)
+
+        # 2. Frame Image
+        k_frame_img = "frame_image_incognito" if is_incognito else "frame_image"
+        img_path = theme.get(k_frame_img)
+        has_image = False
+
+        if img_path:
+            img = self._source(k_frame_img, img_path)
+            if not img.isNull():
+                has_image = True
+                props = theme.get(k_frame_img + "_properties")
+                if props:
+                    scale = props.get('scale', 100) / 100.0; off_x = props.get('x', 0); off_y = props.get('y', 0)
+                else:
+                    scale = 120.0 / img.height(); off_x = 0; off_y = 0
+
+                scaled = self._scaled(k_frame_img, img_path, img, int(img.width() * scale * dpr), int(img.height() * scale * dpr))
+                sy = max(0, (round(scaled.height() / dpr) - 120) // 2)
+                src_rect = QRect(round(max(0, off_x) * dpr), round(max(0, sy + off_y) * dpr), round(w * dpr), round(top_area_h * dpr))
+                p.drawImage(QRect(0, 0, w, top_area_h), scaled, src_rect)
+
+        # 3. Tab Strip Background
+        if not has_image:
+             p.fillRect(0, m["tabs_y"], w, m["tabs_h"], col_frame.darker(108))
+
+    def _paint_tab_strip(self, p, theme, m):
+        browser_mode = m["browser_mode"]
+        col_active_tab = self.color(theme, 'active_tab')
+        col_inactive_tab = self.color(theme, "inactive_tab_incognito" if m["is_incognito"] else "inactive_tab")
+        col_tab_text = self.color(theme, 'tab_text')
+        col_inactive_text = self.color(theme, 'inactive_tab_text')
+
+        ts = self._text_set(browser_mode, m["dpr"]); fm = ts["fm"]
+        tab_w = 200 if browser_mode == "Edge" else 140
+        tab_h = m["tabs_h"] - 8
+        tab_y = m["tabs_y"] + 4
+        radius = 4 if browser_mode == "Edge" else 8
+
+        # Inactive Tab
+        x = 20
+        rect = QRect(x, tab_y, tab_w, tab_h)
+        p.setPen(Qt.NoPen); p.setBrush(col_inactive_tab)
+        p.drawRoundedRect(rect, radius, radius)
+        p.setPen(col_inactive_text)
+        ty = rect.y() + (rect.height() + fm.ascent() - fm.descent()) // 2
+        self._draw_label(p, ts, rect.x() + 14, ty, "Inactive Tab")
+
+        # Active Tab
+        x += tab_w + 10
+        rect = QRect(x, tab_y, tab_w, tab_h)
+        if browser_mode == "Chrome":
+             p.setBrush(col_active_tab)
+             p.drawRoundedRect(rect.x(), rect.y(), rect.width(), rect.height() + 5, radius, radius)
+        else:
+             p.setBrush(col_active_tab)
+             p.drawRoundedRect(rect, radius, radius)
+
+        p.setPen(col_tab_text)
+        ty = rect.y() + (rect.height() + fm.ascent() - fm.descent()) // 2
+        self._draw_label(p, ts, rect.x() + 14, ty, "Active Tab", bold=True)
+
+    def _paint_toolbar(self, p, theme, m):
+        toolbar_y = m["toolbar_y"]
+        p.fillRect(0, toolbar_y, m["w"], m["toolbar_h"], self.color(theme, 'toolbar'))
+
+        # USE BUTTON TINT FOR ARROWS
+        ts = self._text_set(m["browser_mode"], m["dpr"])
+        p.setPen(self.color(theme, 'button_tint'))
+        self._draw_label(p, ts, 15, toolbar_y + 28, "<")
+        self._draw_label(p, ts, 40, toolbar_y + 28, ">")
+
+    def _paint_omnibox(self, p, theme, m):
+        # Omnibox Colors: Auto-select based on incognito state
+        if m["is_incognito"]:
+            col_omni_bg = self.color(theme, 'omnibox_background_incognito')
+            col_omni_text = self.color(theme, 'omnibox_text_incognito')
+        else:
+            col_omni_bg = self.color(theme, 'omnibox_background')
+            col_omni_text = self.color(theme, 'omnibox_text')
+
+        url_rect = m["url_rect"]
+        ts = self._text_set(m["browser_mode"], m["dpr"])
+        p.setBrush(col_omni_bg)
+        p.setPen(Qt.NoPen)
+        p.drawRoundedRect(url_rect, 14, 14)
+
+        p.setPen(col_omni_text)
+
+        text_x = url_rect.x() + 12
+        if m["browser_mode"] == "Brave":
+            self._draw_label(p, ts, text_x, url_rect.y() + 20, "🦁")
+            text_x += 20
+
+        self._draw_label(p, ts, text_x, url_rect.y() + 20, "https://example.com")
+
+    def _paint_bookmarks(self, p, theme, m):
+        ts = self._text_set(m["browser_mode"], m["dpr"])
+        by = m["toolbar_y"] + m["toolbar_h"] + 22
+        p.setPen(self.color(theme, 'bookmark_text'))
+        bx = 20
+        for name in ["Gmail", "YouTube", "Maps"]:
+            self._draw_label(p, ts, bx, by, name)
+            bx += 80
@@ -0,0 +1,107 @@
+import io
+import os
+import shutil
+import struct
+import hashlib
+import zipfile
+import tempfile
+import unittest
+import subprocess
+from logic.crx_writer import RsaKey, write_crx, CRX_MAGIC, CRX_VERSION, SIGNATURE_CONTEXT
+
+OPENSSL = shutil.which("openssl")
+
+def _pb_fields(data):
+    # Minimal protobuf reader: (field, bytes) for the length-delimited fields the CRX3 header uses
+    pos = 0
+    while pos < len(data):
+        tag, pos = _varint(data, pos)
+        assert tag & 7 == 2, "only length-delimited fields expected"
+        n, pos = _varint(data, pos)
+        yield tag >> 3, data[pos:pos + n]; pos += n
+
+def _varint(data, pos):
+    n = shift = 0
+    while True:
+        byte = data[pos]; pos += 1
+        n |= (byte & 0x7F) << shift; shift += 7
+        if not byte & 0x80: return n, pos
+
+def _archive(sink):
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("manifest.json", '{"manifest_version": 3, "name": "Test", "version": "1.0"}')
+        zf.writestr("images/theme_frame.png", os.urandom(4096))
+
+def _parse_crx(data):
+    assert data[:4] == CRX_MAGIC
+    version, header_len = struct.unpack("<II", data[4:12])
+    assert version == CRX_VERSION
+    header = dict(_pb_fields(data[12:12 + header_len]))
+    proof = dict(_pb_fields(header[2]))
+    return proof[1], proof[2], header[10000], data[12 + header_len:] # public key DER, signature, signed header data, archive
+
+@unittest.skipUnless(OPENSSL, "needs the openssl command line tool as an independent verifier")
+class CrxSignatureTest(unittest.TestCase):
+    """Checks keys, signatures and the crx_id with openssl instead of the code that made them."""
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.key = RsaKey.generate()
+        cls.key_path = cls.path("key.pem")
+        with open(cls.key_path, "w") as f: f.write(cls.key.to_pem())
+
+    @classmethod
+    def tearDownClass(cls): shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    @classmethod
+    def path(cls, name): return os.path.join(cls.tmp, name)
+
+    def openssl(self, *args):
+        return subprocess.run([OPENSSL, *args], capture_output=True)
+
+    def write(self, name, data):
+        with open(self.path(name), "wb") as f: f.write(data)
+        return self.path(name)
+
+    def verify(self, key_path, signature, signed):
+        # openssl picks PKCS#1 v1.5 padding for RSA keys by default, which is what CRX3 uses
+        pub = self.openssl("pkey", "-in", key_path, "-pubout", "-out", self.path("pub.pem"))
+        self.assertEqual(pub.returncode, 0, pub.stderr)
+        return self.openssl("dgst", "-sha256", "-verify", self.path("pub.pem"),
+                            "-signature", self.write("sig.bin", signature), self.write("signed.bin", signed)).returncode == 0
+
+    def make_crx(self, key):
+        out = io.BytesIO(); write_crx(out, key, _archive)
+        return out.getvalue()
+
+    def test_generated_key_is_valid(self):
+        check = self.openssl("rsa", "-check", "-noout", "-in", self.key_path)
+        self.assertEqual(check.returncode, 0, check.stderr)
+        self.assertIn(b"RSA key ok", check.stdout)
+
+    def test_public_key_matches_openssl(self):
+        der = self.openssl("pkey", "-in", self.key_path, "-pubout", "-outform", "DER")
+        self.assertEqual(der.stdout, self.key.public_key_der())
+
+    def test_signature_and_crx_id_verify(self):
+        public_key, signature, signed_header_data, archive = _parse_crx(self.make_crx(self.key))
+        der = self.openssl("pkey", "-in", self.key_path, "-pubout", "-outform", "DER").stdout
+        self.assertEqual(public_key, der)
+        self.assertEqual(dict(_pb_fields(signed_header_data))[1], hashlib.sha256(der).digest()[:16])
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(archive)).testzip(), None)
+        signed = SIGNATURE_CONTEXT + struct.pack("<I", len(signed_header_data)) + signed_header_data + archive
+        self.assertTrue(self.verify(self.key_path, signature, signed))
+        tampered = signed[:-1] + bytes([signed[-1] ^ 1])
+        self.assertFalse(self.verify(self.key_path, signature, tampered))
+
+    def test_openssl_generated_key_signs(self):
+        for fmt in ([], ["-traditional"]): # PKCS#8, then PKCS#1
+            gen = self.openssl("genrsa", *fmt, "-out", self.path("ossl.pem"), "2048")
+            self.assertEqual(gen.returncode, 0, gen.stderr)
+            with open(self.path("ossl.pem")) as f: key = RsaKey.from_pem(f.read())
+            public_key, signature, signed_header_data, archive = _parse_crx(self.make_crx(key))
+            signed = SIGNATURE_CONTEXT + struct.pack("<I", len(signed_header_data)) + signed_header_data + archive
+            self.assertTrue(self.verify(self.path("ossl.pem"), signature, signed))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,14 @@
-from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, QFrame, QFormLayout, QPlainTextEdit, QRadioButton, QButtonGroup, QFileDialog)
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, QFrame, QFormLayout, QPlainTextEdit, QRadioButton, QButtonGroup, QFileDialog, QProgressBar)
 from PySide6.QtCore import Qt, Signal
 import os
+import time
+from logic.export_trace import export_log_path
 
 class ExportPage(QWidget):
     start_export_signal = Signal(dict) 
+    cancel_export_signal = Signal()
+    live_export_signal = Signal(dict) # export data with the unpacked directory as dest_path
+    stop_live_signal = Signal()
 
     def __init__(self, persistent_settings, parent=None):
         super().__init__(parent)
@@ -23,7 +28,7 @@ class ExportPage(QWidget):
 
         grp_dest = self.create_group("2. Format & Destination"); dest_lay = QVBoxLayout()
         lbl_fmt = QLabel("Export Format:")
-        self.rb_zip = QRadioButton("ZIP Archive (Recommended for sharing)"); self.rb_crx = QRadioButton("CRX Package (Requires manual packing in Chrome)")
+        self.rb_zip = QRadioButton("ZIP Archive (Recommended for sharing)"); self.rb_crx = QRadioButton("CRX Package (Signed, installs directly)")
         self.rb_zip.setChecked(True)
         self.fmt_group = QButtonGroup(); self.fmt_group.addButton(self.rb_zip); self.fmt_group.addButton(self.rb_crx)
         dest_lay.addWidget(lbl_fmt); dest_lay.addWidget(self.rb_zip); dest_lay.addWidget(self.rb_crx); dest_lay.addSpacing(15)
@@ -32,6 +37,16 @@ class ExportPage(QWidget):
         btn_browse = QPushButton("Browse..."); btn_browse.setProperty("class", "resBtn"); btn_browse.clicked.connect(self.browse_dest)
         path_row.addWidget(self.inp_path); path_row.addWidget(btn_browse)
         dest_lay.addWidget(lbl_path); dest_lay.addLayout(path_row); grp_dest.layout().addLayout(dest_lay); layout.addWidget(grp_dest)
+
+        # Live export: keeps an unpacked extension folder in sync while editing (reload it in the browser)
+        grp_live = self.create_group("3. Live Export (Unpacked Folder)"); live_row = QHBoxLayout()
+        self.inp_live_path = QLineEdit(self.p_settings.get_live_export_dir()); self.inp_live_path.setReadOnly(True)
+        btn_live_browse = QPushButton("Browse..."); btn_live_browse.setProperty("class", "resBtn"); btn_live_browse.clicked.connect(self.browse_live_dir)
+        self.btn_live = QPushButton("Start Live Export"); self.btn_live.setProperty("class", "resBtn"); self.btn_live.setCheckable(True)
+        self.btn_live.toggled.connect(self.on_live_toggled)
+        live_row.addWidget(self.inp_live_path); live_row.addWidget(btn_live_browse); live_row.addWidget(self.btn_live)
+        self.lbl_live_status = QLabel("Not running."); self.lbl_live_status.setWordWrap(True)
+        grp_live.layout().addLayout(live_row); grp_live.layout().addWidget(self.lbl_live_status); layout.addWidget(grp_live)
         
         layout.addStretch()
         btn_row = QHBoxLayout(); btn_row.addStretch()
@@ -39,6 +54,16 @@ class ExportPage(QWidget):
         self.btn_do_export.setFixedSize(180, 45); self.btn_do_export.clicked.connect(self.on_export_clicked)
         btn_row.addWidget(self.btn_do_export); layout.addLayout(btn_row)
 
+        # Progress of a running export (the export itself runs in the background)
+        self.progress_row = QWidget(); prog_lay = QHBoxLayout(self.progress_row); prog_lay.setContentsMargins(0, 0, 0, 0)
+        self.lbl_status = QLabel(); self.progress_bar = QProgressBar(); self.progress_bar.setRange(0, 100)
+        self.btn_cancel = QPushButton("Cancel"); self.btn_cancel.setProperty("class", "resBtn"); self.btn_cancel.clicked.connect(self.cancel_export_signal)
+        prog_lay.addWidget(self.lbl_status, 1); prog_lay.addWidget(self.progress_bar, 2); prog_lay.addWidget(self.btn_cancel)
+        self.progress_row.hide(); layout.addWidget(self.progress_row)
+        # Stage timings of the last export, when Verbose Logs is on
+        self.txt_report = QPlainTextEdit(); self.txt_report.setReadOnly(True); self.txt_report.setFixedHeight(150)
+        self.txt_report.setStyleSheet("font-family: Consolas, monospace;"); self.txt_report.hide(); layout.addWidget(self.txt_report)
+
     def create_group(self, title):
         frame = QFrame(); frame.setObjectName("settingsGroup")
         l = QVBoxLayout(frame); l.setContentsMargins(20, 20, 20, 20)
@@ -51,8 +76,43 @@ class ExportPage(QWidget):
         f, _ = QFileDialog.getSaveFileName(self, f"Save {ext.upper()}", os.path.join(start_dir, f"{default_name}.{ext}"), f"{ext.upper()} Files (*.{ext})")
         if f: self.inp_path.setText(f); self.p_settings.set_last_export_dir(os.path.dirname(f))
 
+    def browse_live_dir(self):
+        d = QFileDialog.getExistingDirectory(self, "Live Export Folder", self.inp_live_path.text() or self.p_settings.get_last_export_dir())
+        if d: self.inp_live_path.setText(d); self.p_settings.set_live_export_dir(d)
+
+    def on_live_toggled(self, checked):
+        if not checked: self.btn_live.setText("Start Live Export"); self.lbl_live_status.setText("Not running."); self.stop_live_signal.emit(); return
+        if not self.inp_live_path.text(): self.browse_live_dir()
+        if not self.inp_live_path.text(): self.btn_live.setChecked(False); return
+        self.btn_live.setText("Stop Live Export"); self.lbl_live_status.setText("Syncing...")
+        self.live_export_signal.emit({**self.metadata(), "format": "dir", "dest_path": self.inp_live_path.text()})
+
+    def live_synced(self, path, written):
+        what = ", ".join(os.path.basename(w) for w in written) if written else "nothing changed"
+        self.lbl_live_status.setText(f"Synced {path} at {time.strftime('%H:%M:%S')} ({what}).")
+
+    def live_failed(self, message): self.lbl_live_status.setText(f"Sync failed: {message}")
+
+    def metadata(self):
+        return { "meta_name": self.inp_name.text() or "Untitled Theme", "meta_author": self.inp_author.text(), "meta_version": self.inp_version.text() or "1.0", "meta_desc": self.inp_desc.toPlainText() }
+
+    def export_started(self):
+        self.btn_do_export.setEnabled(False); self.btn_cancel.setEnabled(True); self.btn_cancel.show()
+        self.progress_bar.setValue(0); self.progress_bar.show(); self.lbl_status.setText("Starting..."); self.progress_row.show()
+        self.txt_report.hide()
+
+    def export_progress(self, stage, percent):
+        self.lbl_status.setText(f"{stage}..."); self.progress_bar.setValue(percent)
+        if percent >= 95: self.btn_cancel.setEnabled(False) # too late to cancel cleanly
+
+    def export_finished(self, message):
+        self.btn_do_export.setEnabled(True); self.btn_cancel.hide(); self.progress_bar.hide()
+        self.lbl_status.setText(message)
+
+    def show_report(self, text): self.txt_report.setPlainText(f"{text}\nLogged to {export_log_path()}"); self.txt_report.show()
+
     def on_export_clicked(self):
         if not self.inp_path.text(): self.browse_dest()
         if not self.inp_path.text(): return
-        export_data = { "meta_name": self.inp_name.text() or "Untitled Theme", "meta_author": self.inp_author.text(), "meta_version": self.inp_version.text() or "1.0", "meta_desc": self.inp_desc.toPlainText(), "format": "zip" if self.rb_zip.isChecked() else "crx", "dest_path": self.inp_path.text() }
+        export_data = { **self.metadata(), "format": "zip" if self.rb_zip.isChecked() else "crx", "dest_path": self.inp_path.text() }
         self.start_export_signal.emit(export_data)
\ No newline at end of file
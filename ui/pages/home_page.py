@@ -4,11 +4,13 @@ from PySide6.QtGui import QPixmap, QColor, QIntValidator
 from PySide6.QtCore import Qt, Signal
 
 from render.preview_renderer import PreviewRenderer
+from render.image_store import ImageStore
 from ui.controls.smart_slider import SmartSlider
 from ui.controls.gradient_slider import GradientSlider
 from ui.controls.theme_toggle import ThemeToggle
 from ui.menu.bloom_tile import BloomTile
 from utils.color_utils import get_color_name
+from logic.theme_model import parse_rgba_hex
 
 # ─── UPDATED: Fullscreen Window ───
 
@@ -214,6 +216,7 @@ class HomePage(QWidget):
         
         self.hue_slider = GradientSlider(Qt.Horizontal, mode="hue"); self.hue_slider.setRange(0, 359)
         self.hue_slider.valueChanged.connect(self.hue_changed)
+        self.hue_slider.sliderPressed.connect(self.slider_pressed); self.hue_slider.sliderReleased.connect(self.slider_released)
         l_col.addWidget(self.hue_slider); l_col.addSpacing(15)
         
         self.sl_r, self.inp_r = self.make_smart_row("R", l_col); self.sl_g, self.inp_g = self.make_smart_row("G", l_col)
@@ -282,12 +285,11 @@ class HomePage(QWidget):
         self.current_edit_mode = real_mode
         if "image" in real_mode: 
             self.stack.setCurrentIndex(1)
-            path = self.theme_data.get(real_mode)
-            self.mini_preview.setPixmap(QPixmap(path)) if path and os.path.exists(path) else self.mini_preview.setText("No Image")
+            self.show_mini_preview(self.theme_data.get(real_mode))
             self.load_image_params(real_mode)
         else: 
             self.stack.setCurrentIndex(0)
-            c = self.color_from_rgba_hex(self.theme_data.get(real_mode, "#FFFFFFFF"))
+            c = self.theme_color(real_mode)
             self.block_signals(True)
             self.hue_slider.setValue(c.hsvHue()); self.sl_r.setValue(c.red()); self.sl_g.setValue(c.green()); self.sl_b.setValue(c.blue()); self.sl_a.setValue(c.alpha())
             self.update_color_info(c); self.block_signals(False)
@@ -309,16 +311,16 @@ class HomePage(QWidget):
             self.sl_scale.setValue(100); self.sl_x.setValue(0); self.sl_y.setValue(0)
             self.block_signals(False)
             return
-        pix = QPixmap(path)
-        if pix.isNull(): return
+        size = self.renderer.store.size(path) # cached, or a header-only read
+        if size.isEmpty(): return
         self.block_signals(True)
         if "ntp_image" in mode:
-            scale = max(self.canvas.width() / pix.width(), self.canvas.height() / pix.height()) * 100
+            scale = max(self.canvas.width() / size.width(), self.canvas.height() / size.height()) * 100
             self.sl_scale.setValue(int(scale)); self.sl_x.setValue(0); self.sl_y.setValue(0)
         elif "frame_image" in mode:
-            scale_val = (120 / pix.height()) 
+            scale_val = (120 / size.height()) 
             self.sl_scale.setValue(int(scale_val * 100))
-            scaled_w = pix.width() * scale_val
+            scaled_w = size.width() * scale_val
             off_x = (scaled_w - 1000) // 2
             self.sl_x.setValue(int(off_x))
             self.sl_y.setValue(0)
@@ -337,25 +339,40 @@ class HomePage(QWidget):
 
     def update_image_params_and_render(self):
         self.save_image_params()
-        self.renderer.apply_image(self.current_edit_mode)
+        self.renderer.schedule_render(); self.mw.save_state_to_history(merge="slider:" + self.current_edit_mode) # merged while dragging or nudging
 
     def refresh_from_data(self):
-        self.set_mode(self.current_base_mode); self.renderer.apply_theme(); self.renderer.apply_image("ntp_image"); self.renderer.apply_image("frame_image")
+        # One render: the engine diffs the new theme state against the last one and repaints only what changed
+        self.set_mode(self.current_base_mode); self.renderer.apply_theme()
     def on_incognito_toggled(self, checked): self.renderer.apply_theme(); self.set_mode(self.current_base_mode)
     def update_browser_skin(self): self.renderer.apply_theme()
     
     def load_image_from_path(self, path):
         self.p_settings.set_last_import_dir(os.path.dirname(path))
-        pix = QPixmap(path)
-        if self.mw.page_settings.chk_resize.isChecked() and (pix.width() > 3000 or pix.height() > 3000): pix = pix.scaled(3000, 3000, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.theme_data[self.current_edit_mode] = path; self.mini_preview.setPixmap(pix)
-        
-        if self.current_edit_mode + "_properties" in self.theme_data:
-            del self.theme_data[self.current_edit_mode + "_properties"]
-        if not pix.isNull():
-            self.load_image_params(self.current_edit_mode)
+        self.mw.begin_history_step() # the new path and its fitted properties are one undo step
+        try:
+            self.theme_data[self.current_edit_mode] = path; self.show_mini_preview(path)
+            if self.current_edit_mode + "_properties" in self.theme_data:
+                del self.theme_data[self.current_edit_mode + "_properties"]
+            if not self.renderer.store.size(path).isEmpty():
+                self.load_image_params(self.current_edit_mode)
+        finally: self.mw.end_history_step()
         self.renderer.apply_image(self.current_edit_mode)
 
+    def show_mini_preview(self, path):
+        # Shows the store's thumbnail; picking another image cancels a pending decode
+        store = self.renderer.store
+        if not path or not os.path.exists(path):
+            store.cancel("mini_preview"); self.mini_preview.setText("No Image"); return
+        self.mini_preview.setText("Loading...")
+        store.request("mini_preview", path, self._on_mini_preview_decoded)
+
+    def _on_mini_preview_decoded(self, path, img):
+        thumb = self.renderer.store.thumbnail(path)
+        if thumb is None and not img.isNull(): thumb = img.scaled(ImageStore.THUMB_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        if thumb is None or thumb.isNull(): self.mini_preview.setText("No Image")
+        else: self.mini_preview.setPixmap(QPixmap.fromImage(thumb))
+
     def _resize_canvas_and_overlays(self, w, h):
         self.canvas.setFixedSize(w, h)
         self.guides_layer.resize(w, h)
@@ -409,30 +426,28 @@ class HomePage(QWidget):
             self.fs_window.closed_signal.connect(self.restore_canvas)
             self.fs_window.showFullScreen()
 
-    def color_from_rgba_hex(self, text):
-        if not isinstance(text, str) or not text.startswith("#") or len(text) != 9: return QColor(255, 255, 255, 255)
-        try: return QColor(int(text[1:3], 16), int(text[3:5], 16), int(text[5:7], 16), int(text[7:9], 16))
-        except ValueError: return QColor(255, 255, 255, 255)
+    def theme_color(self, key): return QColor(*self.theme_data.rgba(key))
     def hue_changed(self):
         c = QColor(self.sl_r.value(), self.sl_g.value(), self.sl_b.value()); h = self.hue_slider.value(); s = c.hsvSaturation() if c.hsvSaturation() > 0 else 150; v = c.value(); new_c = QColor.fromHsv(h, s, v); self.block_signals(True); self.sl_r.setValue(new_c.red()); self.sl_g.setValue(new_c.green()); self.sl_b.setValue(new_c.blue()); self.block_signals(False); self.slider_color_changed()
-    def slider_color_changed(self): r, g, b, a = self.sl_r.value(), self.sl_g.value(), self.sl_b.value(), self.sl_a.value(); c = QColor(r, g, b, a); hex_val = f"#{r:02X}{g:02X}{b:02X}{a:02X}"; self.theme_data[self.current_edit_mode] = hex_val; self.update_color_info(c); self.renderer.apply_theme()
+    def slider_color_changed(self): r, g, b, a = self.sl_r.value(), self.sl_g.value(), self.sl_b.value(), self.sl_a.value(); c = QColor(r, g, b, a); hex_val = f"#{r:02X}{g:02X}{b:02X}{a:02X}"; self.theme_data[self.current_edit_mode] = hex_val; self.update_color_info(c); self.renderer.schedule_render(); self.mw.save_state_to_history(merge="slider:" + self.current_edit_mode)
     def update_color_info(self, c): self.hex_input.blockSignals(True); self.hex_input.setText(f"#{c.red():02X}{c.green():02X}{c.blue():02X}{c.alpha():02X}"); self.hex_input.blockSignals(False); alpha_f = c.alpha() / 255.0; self.color_preview_box.setStyleSheet(f"background-color: rgba({c.red()}, {c.green()}, {c.blue()}, {alpha_f:.3f}); border: 1px solid #ccc; border-radius: 4px;"); self.lbl_color_name.setText(get_color_name(c.red(), c.green(), c.blue(), c.alpha()))
     def hex_changed(self, text):
-        if len(text) != 9 or not text.startswith("#"): return
-        try: r, g, b, a = int(text[1:3], 16), int(text[3:5], 16), int(text[5:7], 16), int(text[7:9], 16)
-        except ValueError: return
-        self.block_signals(True); self.sl_r.setValue(r); self.sl_g.setValue(g); self.sl_b.setValue(b); self.sl_a.setValue(a); self.block_signals(False); c = QColor(r, g, b, a); self.theme_data[self.current_edit_mode] = text; self.update_color_info(c); self.renderer.apply_theme(); self.mw.save_state_to_history() 
+        rgba = parse_rgba_hex(text)
+        if rgba is None: return
+        r, g, b, a = rgba
+        self.block_signals(True); self.sl_r.setValue(r); self.sl_g.setValue(g); self.sl_b.setValue(b); self.sl_a.setValue(a); self.block_signals(False); c = QColor(r, g, b, a); self.theme_data[self.current_edit_mode] = text; self.update_color_info(c); self.renderer.apply_theme(); self.mw.save_state_to_history(merge="hex:" + self.current_edit_mode)
     def open_color_dialog(self):
-        curr_hex = self.theme_data.get(self.current_edit_mode, "#CC0000FF"); init_c = self.color_from_rgba_hex(curr_hex)
+        init_c = self.theme_color(self.current_edit_mode)
         c = QColorDialog.getColor(init_c, self, "Pick Color", QColorDialog.ShowAlphaChannel)
-        if c.isValid(): hex_val = f"#{c.red():02X}{c.green():02X}{c.blue():02X}{c.alpha():02X}"; self.mw.save_state_to_history(); self.hex_changed(hex_val)
+        if c.isValid(): hex_val = f"#{c.red():02X}{c.green():02X}{c.blue():02X}{c.alpha():02X}"; self.mw.begin_history_step(); self.hex_changed(hex_val); self.mw.end_history_step()
     def upload_img(self): f, _ = QFileDialog.getOpenFileName(self, "Select Image", self.p_settings.get_last_import_dir(), "Images (*.png *.jpg)"); self.load_image_from_path(f) if f else None
-    def remove_img(self): self.theme_data[self.current_edit_mode] = None; self.mini_preview.setText("No Image"); self.bg_img.hide() if self.current_edit_mode == "ntp_image" else self.ui_layer.update() 
-    def slider_released(self): self.mw.save_state_to_history()
+    def remove_img(self): self.theme_data[self.current_edit_mode] = None; self.mw.save_state_to_history(); self.show_mini_preview(None); self.bg_img.hide() if self.current_edit_mode == "ntp_image" else self.ui_layer.update() 
+    def slider_pressed(self): self.renderer.begin_interactive(); self.mw.begin_history_step()
+    def slider_released(self): self.renderer.end_interactive(); self.mw.end_history_step() # the whole drag is one undo step
     def block_signals(self, b): 
         for w in [self.sl_r, self.sl_g, self.sl_b, self.sl_a, self.hue_slider, self.sl_scale, self.sl_x, self.sl_y]: w.blockSignals(b)
     def make_smart_row(self, label, layout, val=0, min_v=0, max_v=255):
-        row = QHBoxLayout(); lbl = QLabel(label); lbl.setFixedWidth(35); btn_l = QPushButton("<"); btn_l.setFixedSize(24, 24); btn_l.setProperty("class", "arrowBtn"); sl = SmartSlider(Qt.Horizontal); sl.setRange(min_v, max_v); sl.setValue(val); sl.sliderReleased.connect(self.slider_released); btn_r = QPushButton(">"); btn_r.setFixedSize(24, 24); btn_r.setProperty("class", "arrowBtn"); inp = QLineEdit(str(val)); inp.setFixedWidth(45); inp.setAlignment(Qt.AlignCenter)
+        row = QHBoxLayout(); lbl = QLabel(label); lbl.setFixedWidth(35); btn_l = QPushButton("<"); btn_l.setFixedSize(24, 24); btn_l.setProperty("class", "arrowBtn"); sl = SmartSlider(Qt.Horizontal); sl.setRange(min_v, max_v); sl.setValue(val); sl.sliderPressed.connect(self.slider_pressed); sl.sliderReleased.connect(self.slider_released); btn_r = QPushButton(">"); btn_r.setFixedSize(24, 24); btn_r.setProperty("class", "arrowBtn"); inp = QLineEdit(str(val)); inp.setFixedWidth(45); inp.setAlignment(Qt.AlignCenter)
         if max_v == 255: sl.valueChanged.connect(self.slider_color_changed); inp.setValidator(QIntValidator(0, 255))
         else: sl.valueChanged.connect(self.update_image_params_and_render)
         sl.valueChanged.connect(lambda v: inp.setText(str(v))); inp.textChanged.connect(lambda t: sl.setValue(int(t)) if t and (t.isdigit() or t.startswith('-')) else None); btn_l.clicked.connect(lambda: sl.setValue(sl.value() - 1)); btn_r.clicked.connect(lambda: sl.setValue(sl.value() + 1))
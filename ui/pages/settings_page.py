@@ -1,9 +1,10 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QPushButton, QFrame, QCheckBox, 
                                QLineEdit, QScrollArea, QComboBox, QFormLayout, QGroupBox, 
-                               QTabWidget, QColorDialog, QHBoxLayout, QSlider)
+                               QTabWidget, QColorDialog, QHBoxLayout, QSlider, QSpinBox)
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QColor
 from ui.controls.settings_toggle import SettingsToggle
+from logic.image_pipeline import NTP_TARGET_SIZES
 
 class SettingsPage(QWidget):
     def __init__(self, persistent_settings, parent=None):
@@ -52,6 +53,20 @@ class SettingsPage(QWidget):
         form.addRow(self.lbl("Startup:"), self.chk_preset)
         l.addWidget(grp_pre); grp_pre.layout().addLayout(form)
 
+        grp_hist = self.create_group("Undo History"); form = QFormLayout()
+        # Applied when editing finishes: typing "1000" must not trim history to the 10 steps it passes through
+        self.spin_history_depth = QSpinBox(); self.spin_history_depth.setRange(10, 10000); self.spin_history_depth.setSingleStep(50); self.spin_history_depth.setKeyboardTracking(False)
+        self.spin_history_depth.setValue(self.p_settings.get_history_depth()); self.spin_history_depth.setSuffix(" steps")
+        self.spin_history_depth.valueChanged.connect(self.p_settings.set_history_depth)
+        form.addRow(self.lbl("Max Depth:"), self.spin_history_depth)
+        self.spin_history_budget = QSpinBox(); self.spin_history_budget.setRange(1, 512); self.spin_history_budget.setKeyboardTracking(False)
+        self.spin_history_budget.setValue(self.p_settings.get_history_budget_mb()); self.spin_history_budget.setSuffix(" MB")
+        self.spin_history_budget.valueChanged.connect(self.p_settings.set_history_budget_mb)
+        form.addRow(self.lbl("Memory Budget:"), self.spin_history_budget)
+        self.lbl_history = self.lbl("")
+        form.addRow(self.lbl("In Use:"), self.lbl_history)
+        l.addWidget(grp_hist); grp_hist.layout().addLayout(form)
+
         l.addStretch(); scroll.setWidget(content); layout.addWidget(scroll)
 
     def init_appearance_tab(self):
@@ -125,6 +140,23 @@ class SettingsPage(QWidget):
         form.addRow(self.lbl("Manifest:"), self.chk_json)
         l.addWidget(grp_adv); grp_adv.layout().addLayout(form)
 
+        grp_exp = self.create_group("Export"); form = QFormLayout()
+        self.chk_optimize = QCheckBox("Optimize PNG size (lossless)")
+        self.chk_optimize.setChecked(self.p_settings.get_optimize_png())
+        self.chk_optimize.stateChanged.connect(lambda s: self.p_settings.set_optimize_png(bool(s)))
+        form.addRow(self.lbl("Images:"), self.chk_optimize)
+
+        self.chk_strip = QCheckBox("Strip PNG metadata")
+        self.chk_strip.setChecked(self.p_settings.get_strip_meta())
+        self.chk_strip.stateChanged.connect(lambda s: self.p_settings.set_strip_meta(bool(s)))
+        form.addRow(self.lbl("Metadata:"), self.chk_strip)
+
+        self.combo_ntp_size = QComboBox(); self.combo_ntp_size.addItems([f"{w}x{h}" for w, h in NTP_TARGET_SIZES])
+        self.combo_ntp_size.setCurrentText("{}x{}".format(*self.p_settings.get_ntp_export_size()))
+        self.combo_ntp_size.currentIndexChanged.connect(lambda i: self.p_settings.set_ntp_export_size(NTP_TARGET_SIZES[i]))
+        form.addRow(self.lbl("New Tab Image:"), self.combo_ntp_size)
+        l.addWidget(grp_exp); grp_exp.layout().addLayout(form)
+
         grp_ab = self.create_group("Reset"); v = QVBoxLayout()
         btn_reset = QPushButton("Reset All Settings"); btn_reset.setProperty("class", "dangerBtn")
         btn_reset.clicked.connect(lambda: self.p_settings.settings.clear())
@@ -133,6 +165,9 @@ class SettingsPage(QWidget):
 
         l.addStretch(); scroll.setWidget(content); layout.addWidget(scroll)
 
+    def show_history_stats(self, stats):
+        self.lbl_history.setText(f"{stats['undo']} undo / {stats['redo']} redo steps, {stats['bytes'] / 1024:.1f} KB of {stats['max_bytes'] // (1024 * 1024)} MB")
+
     def create_group(self, title):
         frame = QGroupBox(title); l = QVBoxLayout(frame); l.setContentsMargins(15, 20, 15, 15)
         return frame
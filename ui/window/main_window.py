@@ -12,8 +12,12 @@ from ui.pages.home_page import HomePage
 from ui.styles.app_styles import AppStyles
 from ui.visuals.spotlight_overlay import SpotlightOverlay
 from logic.export_manager import ExportManager
+from logic.live_export import LiveExporter
 from utils.history_manager import HistoryManager
+from utils.session_journal import SessionJournal
 from utils.persistent_settings import PersistentSettings
+from logic.theme_model import ThemeModel, DEFAULT_THEME
+from render.render_engine import ui_metrics
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -22,18 +26,9 @@ class MainWindow(QMainWindow):
         self.resize(1400, 950)
         self.setAcceptDrops(True)
         self.p_settings = PersistentSettings() 
-        self.default_theme_data = {
-            "frame": "#CC0000FF", "toolbar": "#FFFFFFFF", "tab_text": "#000000FF", 
-            "active_tab": "#FFFFFFFF", "inactive_tab": "#E68A8AFF", "inactive_tab_text": "#555555FF", 
-            "button_tint": "#555555FF", "bookmark_text": "#555555FF", "toolbar_text": "#333333FF",
-            "ntp_background": "#FFFFFFFF",
-            "omnibox_background": "#F0F0F0FF", "omnibox_text": "#000000FF",
-            "omnibox_background_incognito": "#3C4043FF", "omnibox_text_incognito": "#E8EAEDFF",
-            "ntp_image": None, "frame_image": None, "img_scale": 100, "img_off_x": 0, "img_off_y": 0,
-            "frame_incognito": "#2B2E31FF", "inactive_tab_incognito": "#3C4043FF", "frame_image_incognito": None
-        }
-        self.theme_data = self.default_theme_data.copy()
-        self.history = HistoryManager()
+        self.theme_data = ThemeModel()
+        self.history = HistoryManager(self.p_settings.get_history_depth(), self.p_settings.get_history_budget_mb() * 1024 * 1024)
+        self.journal = None # started by restore_or_start_session() once the window is up
 
         central = QWidget(); self.setCentralWidget(central)
         self.root_layout = QVBoxLayout(central); self.root_layout.setContentsMargins(0, 0, 0, 0); self.root_layout.setSpacing(0)
@@ -65,10 +60,24 @@ class MainWindow(QMainWindow):
         self.page_settings.chk_guides.stateChanged.connect(self.apply_settings_changes)
         self.page_settings.combo_target.currentTextChanged.connect(self.apply_settings_changes)
         self.page_settings.chk_spot.stateChanged.connect(self.apply_settings_changes)
+        self.page_settings.spin_history_depth.valueChanged.connect(self.apply_history_limits)
+        self.page_settings.spin_history_budget.valueChanged.connect(self.apply_history_limits)
         
         self.content_stack.addWidget(self.page_settings)
         self.page_export = ExportPage(self.p_settings)
         self.page_export.start_export_signal.connect(self.handle_export_request)
+        self.exporter = ExportManager(self)
+        self.exporter.progress.connect(self.page_export.export_progress)
+        self.exporter.finished.connect(self.on_export_finished)
+        self.exporter.failed.connect(self.on_export_failed)
+        self.exporter.report.connect(self.page_export.show_report)
+        self.exporter.cancelled.connect(lambda: self.page_export.export_finished("Export cancelled."))
+        self.page_export.cancel_export_signal.connect(self.exporter.cancel)
+        self.live_exporter = LiveExporter(self)
+        self.live_exporter.synced.connect(self.page_export.live_synced)
+        self.live_exporter.failed.connect(self.page_export.live_failed)
+        self.page_export.live_export_signal.connect(lambda data: self.live_exporter.start(self.theme_data, data, self.p_settings, self.home_page.renderer))
+        self.page_export.stop_live_signal.connect(self.live_exporter.stop)
         self.content_stack.addWidget(self.page_export)
         self.page_help = HelpPage()
         self.content_stack.addWidget(self.page_help)
@@ -103,7 +112,7 @@ class MainWindow(QMainWindow):
         if not file_path.lower().endswith(('.png', '.jpg', '.jpeg')): return
         drop_pos = self.home_page.canvas.mapFrom(self, event.position().toPoint())
         if self.home_page.canvas.rect().contains(drop_pos):
-            if self.home_page.frame_img_layer.geometry().contains(drop_pos): self.home_page.set_mode("frame_image")
+            if drop_pos.y() < ui_metrics(self.home_page.canvas.width(), self.home_page.browser_combo.currentText())["top_area_h"]: self.home_page.set_mode("frame_image")
             else: self.home_page.set_mode("ntp_image")
             self.home_page.load_image_from_path(file_path)
             event.accept()
@@ -112,6 +121,12 @@ class MainWindow(QMainWindow):
         if hasattr(self, 'spotlight'): self.spotlight.resize(self.size())
         super().resizeEvent(event)
 
+    def closeEvent(self, event):
+        self.exporter.cancel(); self.exporter.wait() # don't leave a half-written package behind
+        self.live_exporter.stop(); self.live_exporter.wait()
+        if self.journal: self.journal.close() # a clean exit leaves no session to restore
+        super().closeEvent(event)
+
     def switch_view(self, index):
         self.content_stack.setCurrentIndex(index)
         if index == 0:
@@ -121,7 +136,30 @@ class MainWindow(QMainWindow):
                  self.top_bar.toggle_settings_view()
 
     def handle_export_request(self, export_data):
-        ExportManager.run_export_process(self, self.theme_data, export_data, self.p_settings, self.home_page.renderer, self.page_settings.chk_logs.isChecked())
+        if self.exporter.start(self.theme_data, export_data, self.p_settings, self.home_page.renderer, self.page_settings.chk_logs.isChecked()):
+            self.page_export.export_started()
+
+    def on_export_finished(self, fmt, dest_path):
+        if fmt == 'crx': self.page_export.export_finished(f"CRX package saved to {dest_path}.")
+        else: self.page_export.export_finished(f"Theme package saved successfully to {dest_path}.")
+        if self.p_settings.get_val("open_after_export", "true") == "true" and hasattr(os, "startfile"): os.startfile(os.path.dirname(dest_path))
+
+    def on_export_failed(self, message):
+        self.page_export.export_finished("Export failed.")
+        QMessageBox.critical(self, "Export Failed", f"An error occurred: {message}")
+
+    def restore_or_start_session(self):
+        """Offers to restore the theme from a session that ended in a crash, then autosaves this one."""
+        self.journal = SessionJournal()
+        if not self.journal.acquire(): self.journal = None; return # another instance is running and autosaving
+        state = self.journal.recover()
+        if state is not None and state != dict(self.theme_data.items()):
+            if QMessageBox.question(self, "Restore Session", "The last session did not close properly.\nRestore the theme you were working on?") == QMessageBox.Yes:
+                try:
+                    with self.history.transaction(self.theme_data): self.theme_data.replace(state)
+                except ValueError as e: QMessageBox.warning(self, "Restore Session", f"Could not restore the session: {e}")
+                self.update_history_stats(); self.home_page.refresh_from_data()
+        self.journal.start(self.theme_data)
 
     def import_theme_json(self):
         f, _ = QFileDialog.getOpenFileName(self, "Import Theme JSON", self.p_settings.get_last_import_dir(), "JSON Files (*.json)")
@@ -129,18 +167,28 @@ class MainWindow(QMainWindow):
             self.p_settings.set_last_import_dir(os.path.dirname(f)) 
             try:
                 with open(f, 'r') as file:
-                    data = json.load(file); self.save_state_to_history()
-                    self.theme_data.update({k: v for k, v in data.items() if k in self.default_theme_data})
+                    data = json.load(file)
+                    with self.history.transaction(self.theme_data): self.theme_data.update({k: v for k, v in data.items() if k in DEFAULT_THEME})
+                    self.update_history_stats()
                     self.home_page.refresh_from_data(); QMessageBox.information(self, "Success", "Theme imported!")
             except Exception as e: QMessageBox.critical(self, "Error", f"Could not load file: {e}")
 
-    def save_state_to_history(self): self.history.push_state(self.theme_data)
+    # History: `merge` folds rapid pushes of the same kind into one step; begin/end wrap a gesture
+    def save_state_to_history(self, merge=None): self.history.push_state(self.theme_data, merge); self.update_history_stats()
+    def begin_history_step(self): self.history.begin(self.theme_data)
+    def end_history_step(self): self.history.commit(self.theme_data); self.update_history_stats()
+    def update_history_stats(self): self.page_settings.show_history_stats(self.history.stats())
     def perform_undo(self):
-        prev = self.history.undo(self.theme_data)
-        if prev: self.theme_data = prev; self.home_page.refresh_from_data()
+        state = self.history.undo(self.theme_data)
+        if state is not None: self.theme_data.replace(state); self.home_page.refresh_from_data()
+        self.update_history_stats()
     def perform_redo(self):
-        nxt = self.history.redo(self.theme_data)
-        if nxt: self.theme_data = nxt; self.home_page.refresh_from_data()
+        state = self.history.redo(self.theme_data)
+        if state is not None: self.theme_data.replace(state); self.home_page.refresh_from_data()
+        self.update_history_stats()
+    def apply_history_limits(self):
+        self.history.set_limits(self.page_settings.spin_history_depth.value(), self.page_settings.spin_history_budget.value() * 1024 * 1024)
+        self.update_history_stats()
     
     def apply_preset(self):
         choice = self.combo_presets.currentText()
@@ -176,7 +224,9 @@ class MainWindow(QMainWindow):
                 "omnibox_background": "#373e47ff", "omnibox_text": "#adbac7ff", "ntp_background": "#22272eff"
             }
         }
-        if choice in presets: self.save_state_to_history(); self.theme_data.update(presets[choice]); self.home_page.refresh_from_data(); self.combo_presets.setCurrentIndex(0)
+        if choice in presets:
+            with self.history.transaction(self.theme_data): self.theme_data.update(presets[choice])
+            self.update_history_stats(); self.home_page.refresh_from_data(); self.combo_presets.setCurrentIndex(0)
 
     def apply_settings_changes(self):
         # Canvas Settings
@@ -236,4 +286,6 @@ class MainWindow(QMainWindow):
         self.spotlight.set_theme_mode(True)
 
     def reset_theme_defaults(self):
-        if QMessageBox.question(self, "Reset", "Reset to default?") == QMessageBox.Yes: self.theme_data = self.default_theme_data.copy(); self.home_page.refresh_from_data()
\ No newline at end of file
+        if QMessageBox.question(self, "Reset", "Reset to default?") == QMessageBox.Yes:
+            with self.history.transaction(self.theme_data): self.theme_data.reset()
+            self.update_history_stats(); self.home_page.refresh_from_data()
\ No newline at end of file
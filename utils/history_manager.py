@@ -1,24 +1,120 @@
-import copy
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from logic.theme_model import DELETED
+from logic.theme_state import ThemeState
+
+def value_cost(value):
+    """Approximate bytes a history entry keeps alive for `value` (strings, *_properties dicts, ...)."""
+    if value is None or value is DELETED: return 0 # shared singletons
+    if isinstance(value, dict): return sys.getsizeof(value) + sum(value_cost(k) + value_cost(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)): return sys.getsizeof(value) + sum(value_cost(v) for v in value)
+    return sys.getsizeof(value)
+
+def step_cost(delta):
+    # Keys are interned theme keys, so only the containers and the values count
+    return sys.getsizeof(delta) + sum(sys.getsizeof(entry) + value_cost(entry[1]) + value_cost(entry[2]) for entry in delta)
+
+def merge_deltas(first, second):
+    """One delta with the effect of `first` followed by `second`; keys that end up unchanged drop out."""
+    merged = {key: [old, new] for key, old, new in first}
+    for key, old, new in second:
+        if key in merged: merged[key][1] = new
+        else: merged[key] = [old, new]
+    return tuple((key, old, new) for key, (old, new) in merged.items() if not (old is new or old == new))
 
 class HistoryManager:
-    def __init__(self, max_depth=50):
-        self.undo_stack = []
-        self.redo_stack = []
-        self.max_depth = max_depth
-
-    def push_state(self, state_data):
-        snapshot = copy.deepcopy(state_data)
-        if self.undo_stack and self.undo_stack[-1] == snapshot: return
-        self.undo_stack.append(snapshot)
-        if len(self.undo_stack) > self.max_depth: self.undo_stack.pop(0)
-        self.redo_stack.clear()
+    """Undo/redo as (key, old, new) deltas against a ThemeState baseline, capped by depth and bytes.
+    begin()/commit() and `merge` tags turn one gesture into one step."""
+    MERGE_WINDOW = 1.0
+    def __init__(self, max_depth=200, max_bytes=8 * 1024 * 1024):
+        self.undo_stack = deque()
+        self.redo_stack = deque()
+        self.max_depth = max_depth; self.max_bytes = max_bytes
+        self.bytes = 0
+        self.baseline = None
+        self._depth = 0 # open transactions
+        self._last_merge = None # (merge tag, time) of the step on top of the undo stack
+
+    def set_limits(self, max_depth, max_bytes):
+        self.max_depth = max_depth; self.max_bytes = max_bytes; self._trim()
+
+    def _trim(self):
+        # Oldest undo steps go first; the redo steps furthest from the present only if that is not enough
+        for stack in (self.undo_stack, self.redo_stack):
+            while stack and (len(self.undo_stack) + len(self.redo_stack) > self.max_depth or self.bytes > self.max_bytes):
+                self.bytes -= stack.popleft()[1]
+
+    def stats(self):
+        return {"undo": len(self.undo_stack), "redo": len(self.redo_stack), "bytes": self.bytes, "max_depth": self.max_depth, "max_bytes": self.max_bytes}
+
+    def _commit(self, state, merge=None):
+        """Records the difference between `state` and the baseline; returns it (empty if none)."""
+        state = self._state_of(state)
+        delta = tuple((key, old, new) for key, (old, new) in self.baseline.changes(state, DELETED).items())
+        self.baseline = state
+        if not delta: return delta
+        now = time.monotonic()
+        self.bytes -= sum(cost for _, cost in self.redo_stack); self.redo_stack.clear()
+        last = self._last_merge; self._last_merge = (merge, now) if merge is not None else None
+        if last and self.undo_stack and last[0] == merge and now - last[1] < self.MERGE_WINDOW:
+            previous, cost = self.undo_stack.pop(); self.bytes -= cost
+            delta = merge_deltas(previous, delta)
+            if not delta: self._last_merge = None; return delta # the edits cancelled out
+        cost = step_cost(delta)
+        self.undo_stack.append((delta, cost)); self.bytes += cost
+        self._trim()
+        return delta
+
+    def _state_of(self, state_data):
+        if isinstance(state_data, ThemeState): return state_data
+        if hasattr(state_data, "snapshot"): return state_data.snapshot()
+        return ThemeState.from_dict(state_data)
+
+    def push_state(self, state_data, merge=None):
+        if self.baseline is None: self.baseline = self._state_of(state_data); return
+        if self._depth: return # recorded as one step by commit()
+        self._commit(state_data, merge)
+
+    def begin(self, state_data):
+        """Starts a gesture; edits made before it become their own step first. Transactions nest."""
+        if self._depth == 0 and self.baseline is not None: self._commit(state_data); self._last_merge = None
+        self._depth += 1
+
+    def commit(self, state_data):
+        """Ends a gesture, recording everything it changed as one undo step."""
+        if self._depth == 0: return
+        self._depth -= 1
+        if self._depth == 0 and self.baseline is not None: self._commit(state_data)
+
+    @contextmanager
+    def transaction(self, state_data):
+        self.begin(state_data)
+        try: yield
+        finally: self.commit(state_data)
+
+    def _apply(self, delta, index):
+        # index 1 = the old values (undo), 2 = the new ones (redo)
+        state = self.baseline
+        for step in delta:
+            state = state.delete(step[0]) if step[index] is DELETED else state.set(step[0], step[index])
+        self.baseline = state
+        return state
 
     def undo(self, current_state):
+        """The ThemeState one step before `current_state`, or None."""
+        if self.baseline is None: return None
+        self._depth = 0; self._last_merge = None # undo ends any gesture in progress
+        self._commit(current_state) # edits made since the last push become their own step first
         if not self.undo_stack: return None
-        self.redo_stack.append(copy.deepcopy(current_state))
-        return self.undo_stack.pop()
+        step = self.undo_stack.pop(); self.redo_stack.append(step)
+        return self._apply(step[0], 1)
 
     def redo(self, current_state):
+        if self.baseline is None: return None
+        self._depth = 0; self._last_merge = None
+        if self._commit(current_state): return None # new edits since the undo drop the redo steps
         if not self.redo_stack: return None
-        self.undo_stack.append(copy.deepcopy(current_state))
-        return self.redo_stack.pop()
\ No newline at end of file
+        step = self.redo_stack.pop(); self.undo_stack.append(step)
+        return self._apply(step[0], 2)
@@ -42,6 +42,11 @@ class PersistentSettings:
     def get_show_guides(self): return self.settings.value("show_guides", "true") == "true"
     def set_show_guides(self, val): self.settings.setValue("show_guides", "true" if val else "false")
 
+    def get_history_depth(self): return int(self.settings.value("history_depth", 200)) # undo steps
+    def set_history_depth(self, val): self.settings.setValue("history_depth", val)
+    def get_history_budget_mb(self): return int(self.settings.value("history_budget_mb", 8))
+    def set_history_budget_mb(self, val): self.settings.setValue("history_budget_mb", val)
+
     # --- Import ---
     def get_resize_large(self): return self.settings.value("resize_large", "true") == "true"
     def set_resize_large(self, val): self.settings.setValue("resize_large", "true" if val else "false")
@@ -49,6 +54,18 @@ class PersistentSettings:
     def get_strip_meta(self): return self.settings.value("strip_meta", "true") == "true"
     def set_strip_meta(self, val): self.settings.setValue("strip_meta", "true" if val else "false")
 
+    # --- Export ---
+    def get_optimize_png(self): return self.settings.value("optimize_png", "false") == "true"
+    def set_optimize_png(self, val): self.settings.setValue("optimize_png", "true" if val else "false")
+    def get_optimize_budget(self): return float(self.settings.value("optimize_budget", 10)) # seconds per export
+    def set_optimize_budget(self, val): self.settings.setValue("optimize_budget", val)
+    def get_ntp_export_size(self):
+        w, _, h = str(self.settings.value("ntp_export_size", "1920x1080")).partition("x")
+        return (int(w), int(h)) if w.isdigit() and h.isdigit() else (1920, 1080)
+    def set_ntp_export_size(self, val): self.settings.setValue("ntp_export_size", f"{val[0]}x{val[1]}")
+    def get_live_export_dir(self): return self.settings.value("live_export_dir", "")
+    def set_live_export_dir(self, path): self.settings.setValue("live_export_dir", path)
+
     # --- Presets ---
     def get_auto_preset(self): return self.settings.value("auto_preset", "false") == "true"
     def set_auto_preset(self, val): self.settings.setValue("auto_preset", "true" if val else "false")
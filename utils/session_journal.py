@@ -0,0 +1,113 @@
+"""
+Crash-safe autosave: theme changes are appended to an fsync'd journal and folded into a
+checkpoint every COMPACT_EVERY records. A clean exit deletes both, so finding them means a crash.
+"""
+import os
+import json
+import time
+import queue
+import threading
+from PySide6.QtCore import QStandardPaths, QLockFile
+from logic.theme_model import DELETED
+
+COMPACT_EVERY = 500 # journal records between checkpoints
+BATCH_DELAY = 0.25 # seconds the writer waits for more changes before writing a record
+
+def session_dir():
+    return os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation), "ChromiumThemeStudio", "session")
+
+class SessionJournal:
+    def __init__(self, root=None):
+        self.root = root or session_dir()
+        self.checkpoint_path = os.path.join(self.root, "checkpoint.json")
+        self.journal_path = os.path.join(self.root, "journal.jsonl")
+        # One instance owns the folder; the lock goes stale only once its process is gone, never by age
+        self.lock = QLockFile(os.path.join(self.root, "session.lock")); self.lock.setStaleLockTime(0)
+        self.model = None
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def acquire(self):
+        """Claims the session folder; False while another running instance owns it."""
+        try: os.makedirs(self.root, exist_ok=True)
+        except OSError: return False
+        return self.lock.tryLock(0)
+
+    # --- Restore ---
+    def recover(self):
+        """The theme state left behind by a session that did not shut down cleanly, or None."""
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f: checkpoint = json.load(f)
+            state, seq = checkpoint["state"], checkpoint["seq"]
+        except (OSError, ValueError, KeyError, TypeError): return None
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f: lines = f.readlines()
+        except OSError: lines = []
+        for line in lines:
+            try: record = json.loads(line)
+            except ValueError: break # torn write at the end of the journal
+            if record.get("seq", 0) <= seq: continue # already folded into the checkpoint
+            state.update(record.get("set", {}))
+            for key in record.get("del", []): state.pop(key, None)
+        return state
+
+    # --- Recording ---
+    def start(self, model):
+        """Starts journaling `model` (a ThemeModel), replacing whatever the journal held."""
+        self.model = model
+        self._thread = threading.Thread(target=self._run, args=(dict(model.items()),), name="SessionJournal", daemon=True)
+        self._thread.start()
+        model.subscribe(self._on_changed)
+
+    def _on_changed(self, keys):
+        # Runs on the GUI thread: only grab the new values (kept by reference, theme values are never mutated)
+        self._queue.put({key: self.model.get(key, DELETED) for key in keys})
+
+    def close(self, clean=True):
+        """Stops the writer after it has written everything queued; a clean close deletes the session files."""
+        if self._thread is not None:
+            self.model.unsubscribe(self._on_changed)
+            self._queue.put(None); self._thread.join(); self._thread = None
+            if clean:
+                for path in (self.journal_path, self.checkpoint_path):
+                    try: os.remove(path)
+                    except OSError: pass
+        if self.lock.isLocked(): self.lock.unlock()
+
+    # --- Writer Thread ---
+    def _write_checkpoint(self, state, seq):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "state": state}, f); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def _run(self, state):
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            seq = 0; self._write_checkpoint(state, seq)
+            journal = open(self.journal_path, "w", encoding="utf-8"); records = 0
+        except OSError: return # autosave is best effort; editing carries on without it
+        stop = False
+        with journal:
+            while not stop:
+                changes = self._queue.get()
+                if changes is None: break
+                time.sleep(BATCH_DELAY)
+                while True: # fold everything that arrived meanwhile into the same record
+                    try: more = self._queue.get_nowait()
+                    except queue.Empty: break
+                    if more is None: stop = True; break
+                    changes.update(more)
+                seq += 1
+                record = {"seq": seq, "set": {k: v for k, v in changes.items() if v is not DELETED}, "del": [k for k, v in changes.items() if v is DELETED]}
+                try:
+                    journal.write(json.dumps(record) + "\n"); journal.flush(); os.fsync(journal.fileno())
+                except (OSError, TypeError, ValueError): continue
+                state.update(record["set"])
+                for key in record["del"]: state.pop(key, None)
+                records += 1
+                if records >= COMPACT_EVERY:
+                    try:
+                        self._write_checkpoint(state, seq)
+                        journal.seek(0); journal.truncate(); records = 0
+                    except OSError: pass